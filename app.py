@@ -1,13 +1,24 @@
-import pyttsx3
 import pytesseract
-import speech_recognition as sr
-from PIL import Image
 import time
 import os
 import cv2
 import sys
 import platform
+import queue
+import threading
 import pyaudio  # Required for speech recognition
+import profiling
+from ocr_engine import get_engine_pool
+from ocr_layout import recognize_tiled
+from preprocess import get_pipeline
+from ocr_cache import get_ocr_cache, image_key
+from tts_engine import get_tts_engine
+from tts_pipeline import split_sentences
+from audio_assembly import SentenceAudio, Speaker
+from frame_select import AUTO_CAPTURE, FrameSelector
+from live_ocr import run_live
+from command_recognizer import create_recognizer
+from voice_control import CommandListener, command_source, read_aloud
 
 # Ensure Python 3.x is being used
 if sys.version_info[0] < 3:
@@ -23,54 +34,66 @@ else:
     # Default Linux path
     pytesseract.pytesseract.tesseract_cmd = r"/usr/bin/tesseract"
 
-# Initialize text-to-speech engine
-speech_engine = pyttsx3.init()
-is_paused = False  # Flag to track pause state
-current_sentence_index = 0  # Keeps track of the sentence being read
+# Optimized OCR settings (also part of the OCR cache key)
+OCR_CONFIG = r'--oem 3 --psm 6'
+OCR_LANG = 'eng'
+# Preprocessing stages come from PREPROCESS_PIPELINE (see preprocess.py)
+preprocess_pipeline = get_pipeline('bgr')
 
+# Set DEBUG_IMAGE_DIR to save captured/processed images for debugging (off by default)
+DEBUG_IMAGE_DIR = os.environ.get("DEBUG_IMAGE_DIR", "")
+
+# Sentences are rendered to WAV with the system voice so playback can be interrupted mid-sentence
+SPEECH_ENGINE = "pyttsx3"
+
+@profiling.timed("tts.synthesize")
 def text_to_speech(text):
-    """Reads aloud the given text using text-to-speech."""
-    speech_engine.say(text)
-    speech_engine.runAndWait()
-
-def listen_for_command():
-    """Listens for user commands (pause, resume, repeat, skip)."""
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("\n🎤 Say a command (pause, resume, repeat, skip)...")
-        try:
-            recognizer.adjust_for_ambient_noise(source)  # Reduce background noise
-            audio = recognizer.listen(source)
-            command = recognizer.recognize_google(audio).lower()
-            print(f"✅ You said: {command}")
-            return command
-        except sr.UnknownValueError:
-            print("⚠ Sorry, I didn't understand that.")
-        except sr.RequestError as e:
-            print(f"❌ Error with speech recognition service: {e}")
-    return None
-
-def capture_handwritten_note():
-    """Captures an image of a handwritten note using a webcam."""
+    """Renders the given text to WAV audio using text-to-speech."""
+    return get_tts_engine(SPEECH_ENGINE).synthesize(text)
+
+def dump_debug_image(name, image):
+    """Writes an intermediate image only when DEBUG_IMAGE_DIR is set (opt-in debugging aid)."""
+    if not DEBUG_IMAGE_DIR:
+        return
+    os.makedirs(DEBUG_IMAGE_DIR, exist_ok=True)
+    # Unique names so concurrent runs never clobber each other's dumps
+    path = os.path.join(DEBUG_IMAGE_DIR, f"{name}_{os.getpid()}_{int(time.time() * 1000)}.png")
+    cv2.imwrite(path, image)
+    print(f"🐞 Debug image saved as {path}")
+
+def capture_handwritten_note(auto=AUTO_CAPTURE):
+    """Captures a handwritten note with the webcam and returns the sharpest recent frame.
+
+    With auto=True (AUTO_CAPTURE=1) the note is captured as soon as the page is steady and in focus.
+    """
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         print("Error: Could not access the webcam.")
         return None
     
-    print("📸 Press 'Space' to capture the image or 'Esc' to exit.")
+    # Recent frames are scored for sharpness so a shaky moment at the key press doesn't ruin OCR
+    selector = FrameSelector()
+    captured = None
+    if auto:
+        print("📸 Hold the note steady to capture it automatically, or press 'Space' to capture or 'Esc' to exit.")
+    else:
+        print("📸 Press 'Space' to capture the image or 'Esc' to exit.")
     while True:
         ret, frame = cap.read()
         if not ret:
             print("Error: Failed to capture image.")
             break
         
+        score = selector.add(frame)
+        # The ring already holds a copy, so the overlay can be drawn on the live frame
+        cv2.putText(frame, f"Sharpness {score:.0f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
         cv2.imshow("Scan Handwritten Note", frame)
         key = cv2.waitKey(1)
 
-        if key == 32:  # Space key to capture
-            image_path = "captured_note.png"
-            cv2.imwrite(image_path, frame)
-            print(f"✅ Image saved as {image_path}")
+        if key == 32 or (auto and selector.ready()):  # Space key to capture
+            captured, best_score = selector.best()
+            print(f"✅ Image captured (sharpest of the last {selector.count} frames, sharpness {best_score:.0f})")
+            dump_debug_image("captured_note", captured)
             break
         elif key == 27:  # Esc key to exit
             print("❌ Image capture canceled.")
@@ -78,78 +101,102 @@ def capture_handwritten_note():
 
     cap.release()
     cv2.destroyAllWindows()
-    return image_path
+    return captured
 
-def preprocess_image(image_path):
-    """Enhances image for better OCR accuracy (grayscale + thresholding)."""
-    image = cv2.imread(image_path)
-    if image is None:
-        print(f"Error: Unable to read {image_path}")
+def load_image(image_path):
+    """Reads an image file into a BGR numpy array."""
+    if not os.path.exists(image_path):
+        print(f"Error: Image file '{image_path}' not found.")
         return None
 
-    # Convert to grayscale and apply thresholding for better readability
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+    with profiling.span("decode"):
+        image = cv2.imread(image_path)
+    if image is None:
+        print(f"Error: Unable to read {image_path}")
+    return image
+
+def preprocess_image(image):
+    """Enhances image for better OCR accuracy (grayscale, rescale, adaptive thresholding)."""
+    binary = preprocess_pipeline.run(image)
+    scale = preprocess_pipeline.last_scale
+    if scale != 1.0:
+        print(f"🔍 Rescaled image ×{scale:.2f} for OCR ({image.shape[1]}x{image.shape[0]} → {binary.shape[1]}x{binary.shape[0]})")
     
-    processed_path = "processed_note.png"
-    cv2.imwrite(processed_path, binary)  # Save the processed image
-    return processed_path
+    dump_debug_image("processed_note", binary)
+    return binary
 
-def extract_text_from_image(image_path):
-    """Extracts handwritten text from an image using OCR."""
-    if not os.path.exists(image_path):
-        print(f"Error: Image file '{image_path}' not found.")
-        return ""
-    
-    processed_image = preprocess_image(image_path)
-    if not processed_image:
+def extract_text_from_image(image):
+    """Extracts handwritten text from an image (numpy array or file path) using OCR."""
+    if isinstance(image, str):
+        image = load_image(image)
+    if image is None:
         return ""
 
-    # Optimize OCR settings
-    custom_config = r'--oem 3 --psm 6'
-    extracted_text = pytesseract.image_to_string(Image.open(processed_image), config=custom_config)
+    # Skip OCR entirely if these pixels were already recognized with the same settings
+    cache = get_ocr_cache()
+    with profiling.span("ocr.cache"):
+        key = image_key(image, OCR_CONFIG, preprocess_pipeline.signature(), OCR_LANG)
+        extracted_text = cache.get(key)
+    if extracted_text is None:
+        # The binarized buffer goes straight to the OCR engine, no intermediate files
+        binary = preprocess_image(image)
+        extracted_text = recognize_tiled(binary, get_engine_pool(OCR_LANG, OCR_CONFIG)).strip()
+        cache.put(key, extracted_text)
     
     print("📝 Extracted Text:\n", extracted_text)
-    return extracted_text.strip()
+    return extracted_text
 
-def read_notes_aloud(image_path):
+def read_notes_aloud(image):
     """Reads handwritten notes aloud, allowing voice commands for control."""
-    global is_paused, current_sentence_index
-
-    text = extract_text_from_image(image_path)
+    text = extract_text_from_image(image)
     if not text:
         print("❌ No text found. Exiting...")
         return
     
-    sentences = text.split('. ')  # Split text into sentences
-
-    while current_sentence_index < len(sentences):
-        if not is_paused:
-            text_to_speech(sentences[current_sentence_index])
-            print(f"📖 Reading: {sentences[current_sentence_index]}")
-
-        time.sleep(2)  # Give time before listening for a command
-
-        command = listen_for_command()
-
-        if command:
-            if "pause" in command:
-                print("⏸ Paused.")
-                is_paused = True
-            elif "resume" in command:
-                print("▶ Resuming...")
-                is_paused = False
-            elif "repeat" in command:
-                print("🔄 Repeating last sentence...")
-                text_to_speech(sentences[current_sentence_index])
-            elif "skip" in command:
-                print("⏭ Skipping to next sentence...")
-                current_sentence_index += 1
-                if current_sentence_index < len(sentences):
-                    text_to_speech(sentences[current_sentence_index])
-
-        if not is_paused:
-            current_sentence_index += 1  # Move to the next sentence
+    sentences = split_sentences(text)
+    speaker = Speaker()
+    # The microphone stays open and is calibrated once; commands arrive while a sentence plays.
+    # Commands are recognized offline when a Vosk model or recorded templates exist (VOICE_RECOGNIZER)
+    listener = CommandListener(command_source(), create_recognizer(), on_command=speaker.barge_in)
+    print("\n🎤 Say a command at any time (pause, resume, repeat, skip)...")
+
+    # Upcoming sentences are synthesized and decoded in the background while the current one
+    # plays; decoded sentences stay in a ring buffer so repeat never synthesizes again
+    audio = SentenceAudio(sentences, text_to_speech, get_tts_engine(SPEECH_ENGINE).format)
+    with listener:
+        read_aloud(sentences, audio.clip_for, speaker, listener.commands)
+    audio.close()
+    speaker.close()
+
+def read_live_notes(source=0):
+    """Watches the webcam (or a video file) and reads each new page aloud as soon as it is recognized."""
+    speaker = Speaker()
+    pages = queue.Queue()
+    
+    def queue_page(page_number, text):
+        # Synthesis of the new page starts right away, even while the previous page is still being read
+        sentences = split_sentences(text)
+        pages.put((page_number, sentences, SentenceAudio(sentences, text_to_speech, get_tts_engine(SPEECH_ENGINE).format)))
+    
+    def read_pages():
+        while True:
+            item = pages.get()
+            if item is None:
+                break
+            page_number, sentences, audio = item
+            print(f"\n📖 Page {page_number}")
+            read_aloud(sentences, audio.clip_for, speaker, queue.Queue())
+            audio.close()
+    
+    reader = threading.Thread(target=read_pages, name="live-reader", daemon=True)
+    reader.start()
+    print("📸 Show pages to the camera one at a time; each new page is read aloud. Press 'Esc' to stop.")
+    # OCR runs on a background worker; frames of a page that was already read are skipped almost for free
+    detector = run_live(source, extract_text_from_image, queue_page, show=isinstance(source, int))
+    pages.put(None)
+    reader.join()
+    speaker.close()
+    print(f"✅ {detector.pages} page(s) read, {detector.skipped} of {detector.frames} frames skipped as unchanged")
 
 if __name__ == "__main__":
     print(f"⚙ Using Python version: {sys.version}")
@@ -161,14 +208,25 @@ if __name__ == "__main__":
         print(f"❌ Missing module: {e.name}. Install it using 'pip install {e.name}'")
         sys.exit(1)
 
-    print("\n📷 Do you want to scan a new handwritten note? (yes/no)")
+    print("\n📷 Do you want to scan a new handwritten note? (yes/no/live)")
     user_choice = input().strip().lower()
     
-    if user_choice == "yes":
-        image_path = capture_handwritten_note()
-    else:
-        # Update default image path for testing
-        image_path = "text.png"  # You'll need to provide a sample image
-
-    if image_path:
-        read_notes_aloud(image_path)
\ No newline at end of file
+    if user_choice == "live":
+        print("🎥 Camera number or video file (Enter for the default webcam):")
+        source = input().strip() or "0"
+        read_live_notes(int(source) if source.isdigit() else source)
+        sys.exit(0)
+    
+    # With PROFILING=1 the stages of this note are timed (see PROFILE_JSONL / PROFILE_PROM_FILE)
+    with profiling.request("cli") as record:
+        if user_choice == "yes":
+            with profiling.span("capture"):
+                image = capture_handwritten_note()
+        else:
+            # Update default image path for testing
+            image = load_image("text.png")  # You'll need to provide a sample image
+
+        if image is not None:
+            read_notes_aloud(image)
+    if record is not None:
+        print("⏱ Stage timings:", ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in record.totals().items()))
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""Gapless sentence playback: decoded PCM kept in a ring buffer, played on one output stream.
+
+Each sentence is decoded once, on the synthesis worker threads, into raw PCM and
+stored in a preallocated ring buffer indexed by sentence number, so repeat/skip
+look a clip up in O(1) instead of decoding it again. The Speaker keeps a single
+output stream open and writes clips back to back, so consecutive sentences play
+without the gap of reopening the device or spawning a player per sentence.
+"""
+import io
+import os
+import threading
+import wave
+from collections import OrderedDict, namedtuple
+
+from profiling import span
+from tts_pipeline import SentencePipeline
+from voice_control import INTERRUPTING_COMMANDS
+
+# Decoded audio kept for seeking back; 16 MB is ~6 minutes of 22 kHz mono speech
+PCM_RING_BYTES = int(os.environ.get("PCM_RING_BYTES", str(16 * 1024 * 1024)))
+PLAYBACK_BLOCK_FRAMES = 1024
+
+# Raw interleaved PCM plus the parameters needed to play it
+PCMClip = namedtuple("PCMClip", ["pcm", "channels", "sample_width", "sample_rate"])
+
+
+def decode_clip(data, audio_format, target=None):
+    """Decodes encoded audio (WAV directly, anything else through pydub) into a PCMClip.
+
+    When `target` (a PCMClip whose parameters to match) is given, audio in other
+    parameters is converted so every clip of a note plays on the same stream.
+    """
+    if audio_format == "wav":
+        with wave.open(io.BytesIO(data), "rb") as reader:
+            clip = PCMClip(reader.readframes(reader.getnframes()), reader.getnchannels(),
+                           reader.getsampwidth(), reader.getframerate())
+        if target is None or clip[1:] == target[1:]:
+            return clip
+
+    from pydub import AudioSegment
+    segment = AudioSegment.from_file(io.BytesIO(data), format=audio_format)
+    if target is not None:
+        segment = (segment.set_channels(target.channels).set_sample_width(target.sample_width)
+                   .set_frame_rate(target.sample_rate))
+    return PCMClip(segment.raw_data, segment.channels, segment.sample_width, segment.frame_rate)
+
+
+class PCMRing:
+    """Preallocated byte ring holding decoded clips, looked up by sentence index in O(1).
+
+    Clips are stored contiguously; when the tail has no room the write wraps to
+    the start and the oldest clips it overlaps are dropped.
+    """
+
+    def __init__(self, capacity=PCM_RING_BYTES):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._clips = OrderedDict()
+        self._head = 0
+        self._lock = threading.Lock()
+
+    def put(self, index, pcm):
+        size = len(pcm)
+        if size > self.capacity:
+            raise Exception("Audio clip is larger than the PCM ring buffer")
+        with self._lock:
+            self._clips.pop(index, None)
+            if self._head + size > self.capacity:
+                self._head = 0
+            start, end = self._head, self._head + size
+            for key, (offset, length) in list(self._clips.items()):
+                if offset < end and start < offset + length:
+                    del self._clips[key]
+            self._view[start:end] = pcm
+            self._clips[index] = (start, size)
+            self._head = end
+
+    def get(self, index):
+        """Returns a copy of the clip's PCM, or None if it was never stored or was overwritten."""
+        with self._lock:
+            location = self._clips.get(index)
+            if location is None:
+                return None
+            offset, length = location
+            return bytes(self._view[offset:offset + length])
+
+    def __contains__(self, index):
+        with self._lock:
+            return index in self._clips
+
+
+class SentenceAudio:
+    """Decoded audio for a note's sentences: synthesized and decoded ahead, replayed from the ring.
+
+    clip_for(index) is the `clip_for` callback of PlaybackController/read_aloud.
+    """
+
+    def __init__(self, sentences, synthesize, audio_format, ring=None):
+        self.audio_format = audio_format
+        self.ring = ring or PCMRing()
+        self.params = None
+        self._params_lock = threading.Lock()
+        self._synthesize = synthesize
+        self._pipeline = SentencePipeline(sentences, self._synthesize_pcm)
+
+    def _synthesize_pcm(self, sentence):
+        data = self._synthesize(sentence)
+        with span("audio.decode"):
+            clip = decode_clip(data, self.audio_format, self.params)
+        with self._params_lock:
+            if self.params is None:
+                self.params = clip._replace(pcm=b"")
+        if clip[1:] != self.params[1:]:
+            # A worker raced the first clip with different parameters
+            clip = decode_clip(data, self.audio_format, self.params)
+        return clip
+
+    def clip_for(self, index):
+        pcm = self.ring.get(index)
+        if pcm is not None:
+            return self.params._replace(pcm=pcm)
+        clip = self._pipeline.get(index)
+        self.ring.put(index, clip.pcm)
+        return clip
+
+    def close(self):
+        self._pipeline.close()
+
+
+class Speaker:
+    """One output stream kept open across clips; interrupt() takes effect within one block."""
+
+    def __init__(self):
+        import pyaudio
+        self._audio = pyaudio.PyAudio()
+        self._stream = None
+        self._params = None
+        self._interrupted = threading.Event()
+
+    def _open(self, clip):
+        params = (clip.channels, clip.sample_width, clip.sample_rate)
+        if self._stream is not None and params == self._params:
+            return self._stream
+        self._close_stream()
+        self._stream = self._audio.open(format=self._audio.get_format_from_width(clip.sample_width),
+                                        channels=clip.channels, rate=clip.sample_rate, output=True)
+        self._params = params
+        return self._stream
+
+    def play(self, clip, interrupted=None):
+        """Writes a PCMClip to the stream; returns False if it was interrupted before the end.
+
+        `interrupted` is an event to watch instead of the speaker's own one. The
+        speaker's own event stays set until clear_interrupt() is called, so an
+        interruption that lands between two clips still stops the next one.
+        """
+        if interrupted is None:
+            interrupted = self._interrupted
+        stream = self._open(clip)
+        block = PLAYBACK_BLOCK_FRAMES * clip.channels * clip.sample_width
+        pcm = memoryview(clip.pcm)
+        for start in range(0, len(pcm), block):
+            if interrupted.is_set():
+                return False
+            stream.write(bytes(pcm[start:start + block]))
+        return True
+
+    def interrupt(self):
+        self._interrupted.set()
+
+    def clear_interrupt(self):
+        """Re-arms playback once the command that interrupted it has been taken off the queue."""
+        self._interrupted.clear()
+
+    def barge_in(self, command):
+        """CommandListener callback: stops the current sentence for interrupting commands."""
+        if command in INTERRUPTING_COMMANDS:
+            self.interrupt()
+
+    def _close_stream(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+
+    def close(self):
+        self._close_stream()
+        self._audio.terminate()
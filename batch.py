@@ -0,0 +1,186 @@
+"""Non-interactive batch conversion of scanned notes to audio.
+
+Usage:
+    python batch.py notes/                 # every image in a directory
+    python batch.py "scans/**/*.jpg"       # or a glob
+    python batch.py notes/ --out batch_output --workers 4
+
+For each image, writes <name>.mp3 (or .wav for offline engines) plus a <name>.json sidecar (text, timings) and
+<name>.txt, where <name> is the image's path below the source directory, extension included
+(scans/a/1.jpg -> batch_output/a/1.jpg.mp3). Images whose sidecar already exists are skipped, so a restarted run
+resumes where it left off.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+import profiling
+from audio_stream import encode_stream, tee_to_file
+from conversion import extract_text, speech_chunks
+from sysinfo import available_cores
+from tts_engine import TTS_ENGINE, TTS_ENGINES, get_tts_engine
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+
+def find_images(source):
+    """Expands a directory or glob pattern into a sorted list of image paths."""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p))
+
+
+def source_root(source):
+    """The directory image paths are made relative to: the directory itself, or a glob's fixed prefix."""
+    if os.path.isdir(source):
+        return source
+    parts = []
+    for part in os.path.normpath(source).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    else:
+        # A plain file path
+        parts = parts[:-1]
+    return os.sep.join(parts) or "."
+
+
+def output_paths(image_path, out_dir, audio_format="mp3", root="."):
+    # Keep the subdirectory and extension so scans/a/1.jpg, scans/b/1.jpg and 1.png never share outputs
+    base = os.path.join(out_dir, os.path.relpath(image_path, root))
+    return {"audio": f"{base}.{audio_format}", "text": base + ".txt", "json": base + ".json"}
+
+
+def is_done(image_path, out_dir, root="."):
+    # The JSON sidecar is written last, so its presence marks a finished image
+    return os.path.exists(output_paths(image_path, out_dir, root=root)["json"])
+
+
+def write_atomic(path, data):
+    """Writes bytes to path via a temp file and rename so partial outputs never look finished."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def convert_image(image_path, out_dir, lang, engine=TTS_ENGINE, root="."):
+    """Runs preprocess + OCR + TTS for one image in a worker process and writes its outputs.
+
+    When profiling is enabled the result also carries the image's timing record
+    under "profile", exported by the parent process.
+    """
+    try:
+        with profiling.request("batch", export_record=False, image=os.path.basename(image_path)) as record:
+            result = _convert_image(image_path, out_dir, lang, engine, root)
+            if record is not None:
+                # Preprocessing stages are already recorded as spans; add the coarse stages
+                record.merge({stage: result["timings"][stage] for stage in ("decode", "ocr", "tts")})
+        if record is not None:
+            result = dict(result, profile=record.as_dict())
+        return result
+    except Exception as e:
+        # Re-raise as a plain Exception: some library errors cannot be pickled back to the parent
+        raise Exception(f"{type(e).__name__}: {str(e)}") from None
+
+
+def _convert_image(image_path, out_dir, lang, engine, root):
+    timings = {}
+    paths = output_paths(image_path, out_dir, get_tts_engine(engine).format, root)
+    os.makedirs(os.path.dirname(paths["json"]), exist_ok=True)
+
+    t0 = time.perf_counter()
+    image = cv2.imread(image_path)
+    if image is None:
+        raise Exception(f"Unable to read {image_path}")
+    timings["decode"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    # scale is None when the text came from the OCR cache
+    text, scale = extract_text(image, "bgr", timings)
+    timings["ocr"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if text:
+        # Sentences are synthesized ahead in parallel and written as they arrive
+        fmt = get_tts_engine(engine).format
+        for _ in tee_to_file(encode_stream(speech_chunks(text, lang, engine), fmt), paths["audio"]):
+            pass
+    timings["tts"] = time.perf_counter() - t0
+
+    write_atomic(paths["text"], text.encode("utf-8"))
+    sidecar = {
+        "image": image_path,
+        "text": text,
+        "audio": paths["audio"] if text else None,
+        "lang": lang,
+        "engine": engine,
+        "scale": scale,
+        "timings": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+    }
+    write_atomic(paths["json"], json.dumps(sidecar, ensure_ascii=False, indent=2).encode("utf-8"))
+    return sidecar
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a folder of handwritten notes to audio.")
+    parser.add_argument("source", help="Directory of images or a glob pattern")
+    parser.add_argument("--out", default="batch_output", help="Output directory (default: batch_output)")
+    parser.add_argument("--workers", type=int, default=available_cores(),
+                        help="Worker processes (default: available cores)")
+    parser.add_argument("--lang", default="en", help="Speech language (default: en)")
+    parser.add_argument("--engine", default=TTS_ENGINE, choices=sorted(TTS_ENGINES),
+                        help=f"Speech engine (default: {TTS_ENGINE}); espeak/piper/pyttsx3 work offline")
+    parser.add_argument("--force", action="store_true", help="Re-convert images that are already done")
+    args = parser.parse_args(argv)
+
+    images = find_images(args.source)
+    if not images:
+        print(f"❌ No images found in {args.source}")
+        return 1
+
+    os.makedirs(args.out, exist_ok=True)
+    root = source_root(args.source)
+    pending = [p for p in images if args.force or not is_done(p, args.out, root)]
+    skipped = len(images) - len(pending)
+    print(f"📂 {len(images)} image(s), {skipped} already done, {len(pending)} to convert "
+          f"with {args.workers} worker(s)")
+
+    converted, failed = 0, 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {executor.submit(convert_image, p, args.out, args.lang, args.engine, root): p for p in pending}
+        for future in as_completed(futures):
+            image_path = futures[future]
+            try:
+                result = future.result()
+                profiling.export(result.pop("profile", None))
+                converted += 1
+                print(f"✅ {image_path} ({len(result['text'])} chars)")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {image_path}: {e}")
+    elapsed = time.perf_counter() - start
+
+    rate = converted / elapsed if elapsed > 0 else 0.0
+    print(f"\n⏱ Converted {converted} image(s) in {elapsed:.1f}s ({rate:.2f} images/sec), "
+          f"{skipped} skipped, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
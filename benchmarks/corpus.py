@@ -0,0 +1,115 @@
+"""Synthetic note images with known text, plus the bundled samples, for the pipeline benchmark.
+
+Run from the repository root to write the corpus out for inspection:
+    python -m benchmarks.corpus [out_dir]
+
+Every synthetic page is rendered deterministically (fixed text, fixed noise seed),
+so two runs on different commits OCR exactly the same pixels.
+"""
+import os
+import sys
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GROUND_TRUTH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ground_truth")
+BUNDLED_SAMPLES = ["text.png", "sample_notes.png"]
+
+# Letter-size page, 1 inch margins
+PAGE_INCHES = (8.5, 11.0)
+MARGIN_INCHES = 1.0
+DPIS = (150, 300)
+FONT_POINTS = (11, 16)
+# Standard deviation of the Gaussian pixel noise (0-255 scale)
+NOISE_LEVELS = (0, 12, 30)
+
+NOTE_TEXT = """Photosynthesis turns light energy into chemical energy.
+Plants take in carbon dioxide and water and release oxygen.
+The reaction happens in the chloroplasts of leaf cells.
+Chlorophyll absorbs mostly blue and red light.
+Glucose made by the plant is stored as starch.
+Revision: learn the word equation for the exam.
+Respiration releases the energy stored in glucose.
+It happens in every living cell, day and night.
+Aerobic respiration needs oxygen and makes carbon dioxide.
+Compare both processes in a table before Friday."""
+
+
+def render_note(text, dpi, points, noise, seed=0):
+    """Renders text as a scanned-looking page; returns a BGR image."""
+    width, height = int(PAGE_INCHES[0] * dpi), int(PAGE_INCHES[1] * dpi)
+    page = np.full((height, width), 245, dtype=np.uint8)
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    # Hershey glyphs are ~22 units tall at scale 1; size them like `points` printed at `dpi`
+    scale = points / 72 * dpi / 22
+    thickness = max(1, int(round(scale * 1.6)))
+    line_height = int(points / 72 * dpi * 1.6)
+    margin = int(MARGIN_INCHES * dpi)
+    y = margin + line_height
+    for line in text.splitlines():
+        cv2.putText(page, line, (margin, y), font, scale, 30, thickness, cv2.LINE_AA)
+        y += line_height
+
+    if noise:
+        rng = np.random.default_rng(seed)
+        page = cv2.GaussianBlur(page, (3, 3), 0)
+        noisy = page.astype(np.float32) + rng.normal(0, noise, page.shape).astype(np.float32)
+        page = np.clip(noisy, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(page, cv2.COLOR_GRAY2BGR)
+
+
+def synthetic_corpus(dpis=DPIS, sizes=FONT_POINTS, noise_levels=NOISE_LEVELS):
+    """Yields corpus items for every DPI x font size x noise level combination."""
+    for dpi in dpis:
+        for points in sizes:
+            for noise in noise_levels:
+                image = render_note(NOTE_TEXT, dpi, points, noise, seed=dpi * 1000 + points * 10 + noise)
+                ok, png = cv2.imencode(".png", image)
+                yield {
+                    "name": f"synthetic_{dpi}dpi_{points}pt_noise{noise}",
+                    "data": png.tobytes(),
+                    "dpi": dpi,
+                    "points": points,
+                    "noise": noise,
+                    "truth": NOTE_TEXT,
+                }
+
+
+def bundled_samples(names=BUNDLED_SAMPLES):
+    """Yields the sample images shipped with the repo; ground truth comes from ground_truth/<name>.txt."""
+    for name in names:
+        path = os.path.join(ROOT, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        truth_path = os.path.join(GROUND_TRUTH_DIR, os.path.splitext(name)[0] + ".txt")
+        truth = None
+        if os.path.exists(truth_path):
+            with open(truth_path, encoding="utf-8") as f:
+                truth = f.read()
+        yield {"name": name, "data": data, "dpi": None, "points": None, "noise": None, "truth": truth}
+
+
+def build_corpus(dpis=DPIS, sizes=FONT_POINTS, noise_levels=NOISE_LEVELS, samples=True):
+    corpus = list(synthetic_corpus(dpis, sizes, noise_levels))
+    if samples:
+        corpus.extend(bundled_samples())
+    return corpus
+
+
+def main():
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else "benchmark_corpus"
+    os.makedirs(out_dir, exist_ok=True)
+    for item in build_corpus(samples=False):
+        with open(os.path.join(out_dir, item["name"] + ".png"), "wb") as f:
+            f.write(item["data"])
+        with open(os.path.join(out_dir, item["name"] + ".txt"), "w", encoding="utf-8") as f:
+            f.write(item["truth"])
+    print(f"✅ Corpus written to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark and check of the pooled gTTS client against a local stub of the TTS API.
+
+Run from the repository root:
+    python -m benchmarks.gtts_client [--chars N] [--latency-ms N] [--concurrency N] [--fail-rate F]
+
+The stub answers every part after --latency-ms with the part's own text as
+"audio", and fails a --fail-rate fraction of requests with 503. The run compares
+gTTS's own approach (parts one after another, a new connection each) with
+GTTSClient, checks the parts come back complete and in order, and reports the
+retries the client needed.
+"""
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from gtts import gTTS
+
+from gtts_client import GTTSClient
+
+SENTENCE = "The quick brown fox jumps over the lazy dog while the students take notes. "
+
+
+def part_text(body):
+    """The text a request body asks to speak."""
+    rpc = json.loads(urllib.parse.unquote(body.split("=", 1)[1].rstrip("&")))
+    return json.loads(rpc[0][0][1])[0]
+
+
+def make_handler(latency, fail_rate, seed=0):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    connections = set()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this, delayed ACKs stall kept-alive connections
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            connections.add(self.client_address)
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+            time.sleep(latency)
+            with rng_lock:
+                fail = rng.random() < fail_rate
+            if fail:
+                payload, status = b"unavailable", 503
+            else:
+                audio = base64.b64encode(part_text(body).encode("utf-8")).decode("ascii")
+                payload = (")]}'\n\n" + json.dumps([["wrb.fr", "jQ1olc", f'["{audio}"]', None, None, None,
+                                                      "generic"]], separators=(",", ":")) + "\n").encode("utf-8")
+                status = 200
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler, connections
+
+
+def sequential_fetch(url, bodies):
+    """What gTTS does: one part at a time, a new session (and connection) for each."""
+    audio = []
+    for body in bodies:
+        with requests.Session() as session:
+            response = session.post(url, data=body, headers=gTTS.GOOGLE_TTS_HEADERS)
+        response.raise_for_status()
+        audio.append(GTTSClient._audio(response.text))
+    return b"".join(audio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=2000, help="Length of the note to synthesize")
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    text = (SENTENCE * (args.chars // len(SENTENCE) + 1))[:args.chars]
+    bodies = gTTS(text=text, lang="en").get_bodies()
+    expected = b"".join(part_text(body).encode("utf-8") for body in bodies)
+    handler, connections = make_handler(args.latency_ms / 1000, args.fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/batchexecute"
+    print(f"⏱ {len(text)} characters in {len(bodies)} parts, {args.latency_ms:.0f} ms per request")
+
+    try:
+        if not args.fail_rate:
+            t0 = time.perf_counter()
+            audio = sequential_fetch(url, bodies)
+            sequential = time.perf_counter() - t0
+            print(f"gTTS-style  {sequential * 1000:8.1f} ms  {len(connections)} connection(s)")
+            assert audio == expected, "sequential fetch returned the wrong audio"
+            connections.clear()
+
+        client = GTTSClient(url=url, concurrency=args.concurrency, backoff=0.05, rate=0)
+        t0 = time.perf_counter()
+        audio = client.synthesize(text)
+        pooled = time.perf_counter() - t0
+        print(f"pooled      {pooled * 1000:8.1f} ms  {len(connections)} connection(s), "
+              f"{client.stats['requests']} request(s), {client.stats['retries']} retried")
+        client.close()
+        if audio != expected:
+            raise SystemExit("❌ Pooled client returned parts out of order or incomplete")
+        if not args.fail_rate:
+            print(f"🚀 {sequential / pooled:.1f}x faster with {args.concurrency} parallel fetches")
+        print("✅ Audio complete and in order")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compares per-image OCR latency of the pytesseract subprocess path and a warm tesserocr engine.
+
+Run from the repository root:
+    python -m benchmarks.ocr_engines [image ...] [--repeat N]
+"""
+import argparse
+import statistics
+import time
+
+import cv2
+
+from ocr_engine import DEFAULT_OCR_CONFIG, DEFAULT_OCR_LANG, ENGINES
+
+DEFAULT_IMAGES = ["text.png", "sample_notes.png"]
+
+
+def load_binary(path):
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise SystemExit(f"Error: Unable to read {path}")
+    _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+    return binary
+
+
+def bench_engine(name, images, repeat):
+    start = time.perf_counter()
+    try:
+        engine = ENGINES[name](DEFAULT_OCR_LANG, DEFAULT_OCR_CONFIG)
+        # One untimed warm-up pass so both engines are compared at steady state
+        engine.recognize(images[0])
+    except Exception as e:
+        print(f"{name:<12} unavailable: {e}")
+        return None
+    startup = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeat):
+        for image in images:
+            t0 = time.perf_counter()
+            engine.recognize(image)
+            latencies.append(time.perf_counter() - t0)
+    engine.close()
+
+    latencies.sort()
+    result = {
+        "startup_ms": startup * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+    print(f"{name:<12} startup {result['startup_ms']:8.1f} ms  mean {result['mean_ms']:8.1f} ms  "
+          f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="*", default=DEFAULT_IMAGES)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    images = [load_binary(path) for path in args.images]
+    print(f"⏱ {len(images)} image(s) x {args.repeat} runs per engine")
+    results = {name: bench_engine(name, images, args.repeat) for name in ENGINES}
+
+    baseline, warm = results.get("pytesseract"), results.get("tesserocr")
+    if baseline and warm:
+        print(f"🚀 tesserocr speedup: {baseline['mean_ms'] / warm['mean_ms']:.1f}x per image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""End-to-end pipeline benchmark: decode, preprocess, OCR and local TTS over a fixed corpus.
+
+Run from the repository root:
+    python -m benchmarks.pipeline [--repeat N] [--out results.json] [--compare old.json]
+
+The corpus is the synthetic pages of benchmarks/corpus.py (every DPI x font
+size x noise level) plus the bundled sample images. Each stage is timed on its
+own, with no OCR or TTS cache in the way, and the run is written as JSON
+(latency percentiles, throughput, peak RSS, character error rate). Pass a
+previous run with --compare to see what changed between commits.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.corpus import DPIS, FONT_POINTS, NOISE_LEVELS, ROOT, build_corpus
+from ocr_engine import OCR_ENGINE, get_engine_pool
+from ocr_layout import recognize_tiled
+from preprocess import DEFAULT_PIPELINE, get_pipeline
+from tts_engine import TTS_ENGINES, available_tts_engines, get_tts_engine
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Slower than this (relative to the compared run) is reported as a regression
+REGRESSION_THRESHOLD = 0.10
+# Text sent to the TTS stage (speech time grows with length, so it is capped)
+TTS_CHARS = 400
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(recognized, truth):
+    """Edit distance over the length of the ground truth, whitespace collapsed."""
+    recognized, truth = " ".join(recognized.split()), " ".join(truth.split())
+    return edit_distance(recognized, truth) / max(1, len(truth))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def local_tts_engine(name=None):
+    """The requested engine, or the first installed one that needs no network."""
+    if name:
+        return name
+    for engine in available_tts_engines():
+        if TTS_ENGINES[engine].offline:
+            return engine
+    return None
+
+
+def summarize(latencies, peak):
+    return {
+        "count": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "peak_rss_mb": peak,
+    }
+
+
+def run_benchmark(corpus, repeat, tts_name):
+    """Times every stage over the corpus; returns (stages, accuracy, skipped stages)."""
+    pipeline = get_pipeline("bgr")
+    latencies = {"decode": [], "preprocess": [], "ocr": [], "tts": []}
+    stages, accuracy, skipped = {}, {}, {}
+
+    decoded = {}
+    for _ in range(repeat):
+        for item in corpus:
+            t0 = time.perf_counter()
+            decoded[item["name"]] = cv2.imdecode(np.frombuffer(item["data"], dtype=np.uint8), cv2.IMREAD_COLOR)
+            latencies["decode"].append(time.perf_counter() - t0)
+    stages["decode"] = summarize(latencies["decode"], peak_rss_mb())
+
+    binaries = {}
+    for _ in range(repeat):
+        for item in corpus:
+            t0 = time.perf_counter()
+            binary = pipeline.run(decoded[item["name"]], dpi=item["dpi"])
+            latencies["preprocess"].append(time.perf_counter() - t0)
+            # run() returns a per-thread buffer that the next run() overwrites
+            binaries[item["name"]] = binary.copy()
+    stages["preprocess"] = summarize(latencies["preprocess"], peak_rss_mb())
+
+    try:
+        pool = get_engine_pool()
+        pool.recognize(binaries[corpus[0]["name"]])
+    except Exception as e:
+        skipped["ocr"] = str(e)
+    else:
+        for run in range(repeat):
+            for item in corpus:
+                t0 = time.perf_counter()
+                text = recognize_tiled(binaries[item["name"]], pool).strip()
+                latencies["ocr"].append(time.perf_counter() - t0)
+                if run == 0 and item["truth"] is not None:
+                    accuracy[item["name"]] = character_error_rate(text, item["truth"])
+        stages["ocr"] = summarize(latencies["ocr"], peak_rss_mb())
+
+    if tts_name is None:
+        skipped["tts"] = "no offline speech engine is installed"
+    else:
+        try:
+            engine = get_tts_engine(tts_name)
+            texts = [item["truth"][:TTS_CHARS] for item in corpus if item["truth"]]
+            # Engines that load a model do it on first use; keep that out of the timings
+            engine.synthesize(texts[0][:20])
+            for _ in range(repeat):
+                for text in texts:
+                    t0 = time.perf_counter()
+                    engine.synthesize(text)
+                    latencies["tts"].append(time.perf_counter() - t0)
+            stages["tts"] = summarize(latencies["tts"], peak_rss_mb())
+        except Exception as e:
+            skipped["tts"] = str(e)
+    return stages, accuracy, skipped
+
+
+def compare(current, previous, threshold=REGRESSION_THRESHOLD):
+    """Prints per-stage and accuracy changes; returns the list of regressions."""
+    regressions = []
+    print(f"\n📊 Compared with {previous.get('commit') or 'previous run'}:")
+    for stage, result in current["stages"].items():
+        old = previous.get("stages", {}).get(stage)
+        if not old:
+            continue
+        change = result["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        flag = "❌" if change > threshold else "✅"
+        print(f"{flag} {stage:<11} p50 {old['p50_ms']:8.1f} → {result['p50_ms']:8.1f} ms ({change:+.0%})")
+        if change > threshold:
+            regressions.append(f"{stage} p50 {change:+.0%}")
+
+    old_cer, new_cer = previous.get("cer_mean"), current.get("cer_mean")
+    if old_cer is not None and new_cer is not None:
+        flag = "❌" if new_cer > old_cer + 0.01 else "✅"
+        print(f"{flag} {'CER':<11}     {old_cer:8.3f} → {new_cer:8.3f}")
+        if new_cer > old_cer + 0.01:
+            regressions.append(f"CER {old_cer:.3f} -> {new_cer:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dpi", type=int, nargs="+", default=list(DPIS))
+    parser.add_argument("--size", type=int, nargs="+", default=list(FONT_POINTS), help="Font sizes in points")
+    parser.add_argument("--noise", type=int, nargs="+", default=list(NOISE_LEVELS))
+    parser.add_argument("--no-samples", action="store_true", help="Leave out the bundled sample images")
+    parser.add_argument("--tts-engine", help="Speech engine to time (default: first offline engine installed)")
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.dpi, args.size, args.noise, samples=not args.no_samples)
+    tts_name = local_tts_engine(args.tts_engine)
+    print(f"⏱ {len(corpus)} image(s) x {args.repeat} runs, OCR engine {OCR_ENGINE}, "
+          f"TTS engine {tts_name or 'none'}")
+
+    started = time.perf_counter()
+    stages, accuracy, skipped = run_benchmark(corpus, args.repeat, tts_name)
+    elapsed = time.perf_counter() - started
+
+    for stage, result in stages.items():
+        print(f"{stage:<11} p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+              f"peak RSS {result['peak_rss_mb']:7.1f} MB")
+    for stage, reason in skipped.items():
+        print(f"{stage:<11} skipped: {reason}")
+
+    # Images per second through decode + preprocess + OCR, one at a time
+    throughput_stages = [stage for stage in ("decode", "preprocess", "ocr") if stage in stages]
+    per_image = sum(stages[stage]["mean_ms"] for stage in throughput_stages)
+    throughput = 1000 / per_image if per_image else None
+    cer_mean = sum(accuracy.values()) / len(accuracy) if accuracy else None
+    if throughput:
+        print(f"🚀 {throughput:.2f} images/sec per core ({' + '.join(throughput_stages)})")
+    if cer_mean is not None:
+        print(f"🎯 mean CER {cer_mean:.3f} over {len(accuracy)} image(s)")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "repeat": args.repeat, "dpi": args.dpi, "size": args.size, "noise": args.noise,
+            "samples": not args.no_samples, "ocr_engine": OCR_ENGINE, "preprocess": DEFAULT_PIPELINE,
+            "tts_engine": tts_name,
+        },
+        "corpus": [{key: item[key] for key in ("name", "dpi", "points", "noise")} for item in corpus],
+        "elapsed_s": elapsed,
+        "stages": stages,
+        "skipped": skipped,
+        "throughput_images_per_s": throughput,
+        "throughput_stages": throughput_stages,
+        "peak_rss_mb": peak_rss_mb(),
+        "cer": accuracy,
+        "cer_mean": cer_mean,
+    }
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{results['commit'] or 'latest'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Stress test for per-session playback: many sessions issuing commands in parallel.
+
+Run from the repository root:
+    python -m benchmarks.playback_sessions [--sessions N] [--sentences N] [--commands N]
+
+Checks that sessions never see each other's sentences, that cursors stay in
+range, that paused sessions use no CPU, and that every thread is joined once
+the sessions end.
+"""
+import argparse
+import random
+import threading
+import time
+
+from playback import SessionRegistry
+
+CLIP_SECONDS = 0.01
+
+
+class FakeSpeaker:
+    """Stands in for the sound card: a clip "plays" for CLIP_SECONDS unless interrupted."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.played = []
+
+    def play(self, clip, interrupted):
+        self.played.append(clip)
+        return not interrupted.wait(CLIP_SECONDS)
+
+    def close(self):
+        pass
+
+
+def run_session(registry, session_id, sentences, commands, errors):
+    controller = registry.get(session_id)
+    speaker = FakeSpeaker(session_id)
+    controller.start([f"{session_id}:{i}" for i in range(sentences)],
+                     lambda i: (session_id, i), speaker)
+    rng = random.Random(session_id)
+    for _ in range(commands):
+        time.sleep(rng.uniform(0, CLIP_SECONDS * 2))
+        controller.command(rng.choice(["pause", "resume", "repeat", "skip"]))
+        status = controller.snapshot()
+        if not 0 <= status["position"] <= sentences:
+            errors.append(f"session {session_id}: cursor {status['position']} out of range")
+    controller.command("resume")
+    if not controller.wait_until_finished(timeout=sentences * CLIP_SECONDS * 20 + 5):
+        errors.append(f"session {session_id}: did not finish")
+    for owner, index in speaker.played:
+        if owner != session_id or not 0 <= index < sentences:
+            errors.append(f"session {session_id}: played foreign clip {owner}:{index}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--sentences", type=int, default=20)
+    parser.add_argument("--commands", type=int, default=30)
+    args = parser.parse_args()
+
+    baseline_threads = threading.active_count()
+    registry = SessionRegistry()
+    errors = []
+    print(f"⏱ {args.sessions} sessions x {args.commands} commands, {args.sentences} sentences each")
+
+    t0 = time.perf_counter()
+    drivers = [threading.Thread(target=run_session,
+                                args=(registry, sid, args.sentences, args.commands, errors))
+               for sid in range(args.sessions)]
+    for driver in drivers:
+        driver.start()
+    for driver in drivers:
+        driver.join()
+    print(f"✅ all sessions finished in {time.perf_counter() - t0:.2f} s")
+
+    # A note without sentences: commands must leave the cursor at 0 and never ask for a clip
+    def no_clip(index):
+        errors.append(f"empty note: asked for clip {index}")
+    controller = registry.get("empty")
+    controller.start([], no_clip, FakeSpeaker("empty"))
+    for command in ("repeat", "resume", "skip", "pause", "resume"):
+        controller.command(command)
+        status = controller.snapshot()
+        if status["position"] != 0 or status["playing"]:
+            errors.append(f"empty note: {command} left cursor {status['position']}, playing={status['playing']}")
+    controller.close()
+    registry.reap(lambda session_id: session_id != "empty")
+
+    for sid in range(args.sessions):
+        controller = registry.get(sid)
+        controller.start([str(i) for i in range(args.sentences)], lambda i: i, FakeSpeaker(sid))
+        controller.command("pause")
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    time.sleep(1.0)
+    idle_cpu = (time.process_time() - cpu0) / (time.perf_counter() - wall0)
+    print(f"💤 CPU while {args.sessions} sessions are paused: {idle_cpu * 100:.2f}%")
+
+    # Sessions end: the registry closes their controllers and joins the threads
+    t0 = time.perf_counter()
+    closed = registry.reap(lambda session_id: False)
+    leaked = threading.active_count() - baseline_threads
+    print(f"🧹 closed {closed} sessions in {(time.perf_counter() - t0) * 1000:.1f} ms, leaked threads: {leaked}")
+
+    if leaked:
+        errors.append(f"{leaked} threads still running after the sessions ended")
+    if idle_cpu > 0.05:
+        errors.append(f"paused sessions used {idle_cpu * 100:.1f}% CPU")
+    for error in errors[:20]:
+        print(f"❌ {error}")
+    raise SystemExit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
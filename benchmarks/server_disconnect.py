@@ -0,0 +1,124 @@
+"""Check of the HTTP service when clients hang up in the middle of an audio stream.
+
+Run from the repository root:
+    python -m benchmarks.server_disconnect [--clients N] [--sentences N]
+
+The server runs in-process on a local port with a stub speech engine that
+takes SENTENCE_SECONDS per sentence. Each client reads the first chunk of
+/tts and disconnects. The check then waits for every stream to be cleaned up:
+- its TTS queue slot is freed
+- its sentence pipeline is closed, so no synthesis threads are left
+- its timing record is finished and counted in /metrics
+"""
+import argparse
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+
+# Set before the service modules read them at import time
+os.environ["PROFILING"] = "1"
+os.environ.setdefault("TTS_CACHE_DIR", tempfile.mkdtemp(prefix="tts_cache_"))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+import server  # noqa: E402
+from tts_engine import TTSEngine, register_tts_engine  # noqa: E402
+
+SENTENCE_SECONDS = 0.05
+
+
+@register_tts_engine
+class StubEngine(TTSEngine):
+    """Answers every sentence after SENTENCE_SECONDS with its own text as "audio"."""
+
+    name = "stub"
+    label = "Stub (benchmark)"
+    format = "mp3"
+
+    def synthesize(self, text, lang="en", voice=""):
+        time.sleep(SENTENCE_SECONDS)
+        return text.encode("utf-8")
+
+
+def finished_streams(client):
+    """Timing records of /tts streams counted so far, read from /metrics."""
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith('inktalk_request_seconds_count{entry="server.tts"}'):
+            return int(line.split()[-1])
+    return 0
+
+
+def synthesis_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("tts_")]
+
+
+def hang_up(url, sentences):
+    """Starts a stream, reads its first chunk and disconnects."""
+    text = " ".join(f"Sentence {i} of {uuid.uuid4().hex}." for i in range(sentences))
+    with httpx.Client(base_url=url, timeout=10) as client:
+        with client.stream("POST", "/tts", json={"text": text, "engine": "stub"}) as response:
+            response.raise_for_status()
+            next(response.iter_bytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--sentences", type=int, default=50)
+    args = parser.parse_args()
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    service = uvicorn.Server(uvicorn.Config(server.app, log_level="warning"))
+    thread = threading.Thread(target=service.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not service.started:
+        time.sleep(0.01)
+
+    errors = []
+    try:
+        print(f"⏱ {args.clients} clients hang up after the first chunk of {args.sentences} sentences")
+        t0 = time.perf_counter()
+        clients = [threading.Thread(target=hang_up, args=(url, args.sentences)) for _ in range(args.clients)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+        with httpx.Client(base_url=url, timeout=10) as client:
+            # Whole streams would take sentences * SENTENCE_SECONDS; cleanup should be far quicker
+            deadline = time.perf_counter() + args.sentences * SENTENCE_SECONDS / 2
+            while time.perf_counter() < deadline:
+                done = (server.tts_admission.pending == 0 and not synthesis_threads()
+                        and finished_streams(client) >= args.clients)
+                if done:
+                    break
+                time.sleep(0.05)
+            finished = finished_streams(client)
+        print(f"🧹 cleaned up in {time.perf_counter() - t0:.2f} s: {server.tts_admission.pending} queue slot(s) "
+              f"held, {len(synthesis_threads())} synthesis thread(s) left, {finished} record(s) finished")
+
+        if server.tts_admission.pending:
+            errors.append(f"{server.tts_admission.pending} TTS queue slots were never released")
+        if synthesis_threads():
+            errors.append(f"{len(synthesis_threads())} synthesis threads still running")
+        if finished < args.clients:
+            errors.append(f"only {finished} of {args.clients} timing records were finished")
+    finally:
+        service.should_exit = True
+        thread.join(timeout=5)
+
+    for error in errors:
+        print(f"❌ {error}")
+    if not errors:
+        print("✅ Every abandoned stream was closed")
+    raise SystemExit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Measures cold-start and rerun latency of the Streamlit pages without a browser.
+
+Run from the repository root:
+    python -m benchmarks.streamlit_startup [page ...] [--repeat N]
+
+A rerun is timed by toggling the input-method radio, the most common interaction.
+"script" is the page's own run time (st.session_state["rerun_ms"]); "wall" also
+includes the test harness serializing and parsing the element tree.
+"""
+import argparse
+import os
+import sys
+import time
+
+# The repo's own streamlit.py would shadow the streamlit package, so import it from site-packages first
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path = [p for p in sys.path if os.path.abspath(p or ".") != ROOT]
+from streamlit.testing.v1 import AppTest  # noqa: E402
+sys.path.append(ROOT)
+
+DEFAULT_PAGES = ["streamlit.py", "streamlit2.py"]
+INPUT_METHODS = ["📸 Use Camera", "📤 Upload Image"]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def bench_page(page, repeat):
+    app = AppTest.from_file(os.path.join(ROOT, page), default_timeout=60)
+    t0 = time.perf_counter()
+    try:
+        app.run()
+    except Exception as e:
+        print(f"{page:<16} unavailable: {e}")
+        return None
+    cold = time.perf_counter() - t0
+    if app.exception:
+        print(f"{page:<16} failed: {app.exception[0].message}")
+        return None
+
+    latencies, script = [], []
+    for i in range(repeat):
+        radio = app.radio(key="input_method").set_value(INPUT_METHODS[i % 2])
+        t0 = time.perf_counter()
+        radio.run()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        script.append(app.session_state["rerun_ms"])
+
+    result = {
+        "cold_start_ms": cold * 1000,
+        "rerun_wall_p50_ms": percentile(latencies, 0.5),
+        "rerun_wall_p95_ms": percentile(latencies, 0.95),
+        "rerun_script_p50_ms": percentile(script, 0.5),
+        "rerun_script_p95_ms": percentile(script, 0.95),
+    }
+    print(f"{page:<16} cold start {result['cold_start_ms']:7.1f} ms  "
+          f"rerun script p50 {result['rerun_script_p50_ms']:5.1f} ms  p95 {result['rerun_script_p95_ms']:5.1f} ms  "
+          f"(wall p50 {result['rerun_wall_p50_ms']:5.1f} ms)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=DEFAULT_PAGES)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"⏱ {args.repeat} reruns per page")
+    for page in args.pages:
+        bench_page(page, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
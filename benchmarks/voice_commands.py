@@ -0,0 +1,166 @@
+"""Check of hands-free reading: commands from WAV recordings driving read_aloud.
+
+Run from the repository root:
+    python -m benchmarks.voice_commands
+
+Each command is recorded as a short tone at its own pitch, after a second of
+room noise for calibration, and written to a WAV fixture. A CommandListener
+reads the fixture through WavSource, the energy detector cuts the tones into
+utterances and a pitch recognizer turns them back into commands. The fixtures
+are played in at chosen points of the reading (mid-sentence, right after a
+sentence ends, between two sentences) and the sentences actually heard are
+compared with the expected ones.
+"""
+import os
+import queue
+import tempfile
+import threading
+import wave
+
+import numpy as np
+
+from audio_assembly import PLAYBACK_BLOCK_FRAMES, PCMClip, Speaker
+from command_recognizer import CommandRecognizer
+from voice_control import SAMPLE_RATE, CommandListener, WavSource, read_aloud
+
+TONES = {"pause": 440, "resume": 660, "repeat": 880, "skip": 1100}
+TONE_MS = 300
+GAP_MS = 500
+SENTENCES = ["First sentence.", "Second sentence.", "Third sentence."]
+BLOCKS_PER_SENTENCE = 8
+
+
+def write_fixture(path, commands, seed=0):
+    """Writes a 16-bit mono WAV: a second of noise, then each command's tone followed by a pause."""
+    rng = np.random.default_rng(seed)
+    parts = [rng.normal(0, 50, SAMPLE_RATE)]
+    for command in commands:
+        t = np.arange(SAMPLE_RATE * TONE_MS // 1000) / SAMPLE_RATE
+        parts.append(8000 * np.sin(2 * np.pi * TONES[command] * t))
+        parts.append(rng.normal(0, 50, SAMPLE_RATE * GAP_MS // 1000))
+    samples = np.concatenate(parts).astype(np.int16)
+    with wave.open(path, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(SAMPLE_RATE)
+        writer.writeframes(samples.tobytes())
+
+
+class ToneRecognizer(CommandRecognizer):
+    """Names the command whose tone is closest to the utterance's strongest frequency."""
+
+    name = "tones"
+    hangover_ms = 150
+
+    def recognize(self, pcm, sample_rate):
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+        peak = np.argmax(np.abs(np.fft.rfft(samples))) * sample_rate / samples.size
+        return min(TONES, key=lambda command: abs(TONES[command] - peak))
+
+
+class FakeSpeaker(Speaker):
+    """The real Speaker.play() writing to a stream that only counts blocks.
+
+    `hooks[(sentence, block)]` runs right after that block is written, and
+    `hooks[(sentence, None)]` when the sentence's clip is fetched, before it plays.
+    """
+
+    def __init__(self, hooks):
+        self._interrupted = threading.Event()
+        self.hooks = hooks
+        self.heard = []
+        self._sentence = None
+        self._blocks = 0
+
+    def clip_for(self, index):
+        self._run_hook(index, None)
+        self._sentence = index
+        return PCMClip(bytes(2 * PLAYBACK_BLOCK_FRAMES * BLOCKS_PER_SENTENCE), 1, 2, SAMPLE_RATE)
+
+    def play(self, clip, interrupted=None):
+        self._blocks = 0
+        finished = super().play(clip, interrupted)
+        self.heard.append((self._sentence, finished))
+        return finished
+
+    def _open(self, clip):
+        return self
+
+    def write(self, data):
+        self._run_hook(self._sentence, self._blocks)
+        self._blocks += 1
+
+    def _run_hook(self, sentence, block):
+        hook = self.hooks.pop((sentence, block), None)
+        if hook:
+            hook(self)
+
+    def close(self):
+        pass
+
+
+def say(path):
+    """A hook that plays a fixture into the listener and waits until all its commands are queued."""
+    def hook(speaker):
+        listener = CommandListener(WavSource(path), ToneRecognizer(), on_command=speaker.barge_in)
+        # Every fixture feeds the one queue read_aloud reads from
+        listener.commands = speaker.commands
+        listener.start()
+        listener.join()
+    return hook
+
+
+def run_scenario(name, hooks, expected):
+    speaker = FakeSpeaker(hooks)
+    speaker.commands = queue.Queue()
+    reader = threading.Thread(target=read_aloud, args=(SENTENCES, speaker.clip_for, speaker, speaker.commands),
+                              daemon=True)
+    reader.start()
+    reader.join(timeout=10)
+    if reader.is_alive():
+        return f"{name}: still reading after 10 s, heard {speaker.heard}"
+    if speaker.hooks:
+        return f"{name}: never reached {sorted(speaker.hooks, key=str)}"
+    if speaker.heard != expected:
+        return f"{name}: heard {speaker.heard}, expected {expected}"
+    return None
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        fixtures = {}
+        for commands in (["repeat"], ["skip"], ["pause", "resume"]):
+            path = os.path.join(folder, "_".join(commands) + ".wav")
+            write_fixture(path, commands)
+            fixtures[tuple(commands)] = path
+
+        scenarios = [
+            ("uninterrupted", {}, [(0, True), (1, True), (2, True)]),
+            ("repeat mid-sentence", {(1, 2): say(fixtures[("repeat",)])},
+             [(0, True), (1, False), (1, True), (2, True)]),
+            ("skip mid-sentence", {(1, 2): say(fixtures[("skip",)])},
+             [(0, True), (1, False), (2, True)]),
+            # Heard after the check that follows sentence 0: it must still stop sentence 1
+            ("skip between sentences", {(1, None): say(fixtures[("skip",)])},
+             [(0, True), (1, False), (2, True)]),
+            # Sentence 0 had already ended: resuming goes on with sentence 1, not 0 again
+            ("pause after a sentence ends", {(0, BLOCKS_PER_SENTENCE - 1): say(fixtures[("pause", "resume")])},
+             [(0, True), (1, True), (2, True)]),
+            # Cut off with no command to act on: reading moves on instead of replaying it
+            ("interrupt without a command", {(1, 2): Speaker.interrupt},
+             [(0, True), (1, False), (2, True)]),
+        ]
+        errors = []
+        for name, hooks, expected in scenarios:
+            error = run_scenario(name, hooks, expected)
+            print(f"{'❌' if error else '✅'} {name}")
+            if error:
+                errors.append(error)
+
+    if errors:
+        raise SystemExit("❌ " + "\n❌ ".join(errors))
+    print("✅ Every command acted on the right sentence")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Recognizers that turn spoken audio into playback commands.
+
+Only six words ever need to be recognized, so the default recognizers run
+locally: a grammar-constrained Vosk model when one is installed, or a template
+matcher (MFCC features + dynamic time warping) against a few recorded examples
+of each command. Google's web API stays available as the "google" recognizer.
+
+Record templates once with:
+    python command_recognizer.py record
+"""
+import functools
+import glob
+import json
+import os
+import sys
+import wave
+
+import numpy as np
+
+from voice_control import COMMANDS, HANGOVER_MS, parse_command
+
+# "auto" picks vosk, then template, then google, whichever is usable here
+VOICE_RECOGNIZER = os.environ.get("VOICE_RECOGNIZER", "auto")
+# Directory of a Vosk model, e.g. vosk-model-small-en-us-0.15
+VOSK_MODEL = os.environ.get("VOSK_MODEL", "")
+# Recorded examples named <command>_<n>.wav
+VOICE_TEMPLATE_DIR = os.environ.get("VOICE_TEMPLATE_DIR", "voice_templates")
+# Largest DTW distance (per aligned frame) still accepted as a match
+TEMPLATE_MAX_DISTANCE = float(os.environ.get("TEMPLATE_MAX_DISTANCE", "12.0"))
+# The best command must also beat the runner-up command by this ratio (rejects noise and other words)
+TEMPLATE_MAX_RATIO = float(os.environ.get("TEMPLATE_MAX_RATIO", "0.8"))
+TEMPLATES_PER_COMMAND = 3
+
+
+@functools.lru_cache(maxsize=2)
+def load_vosk_model(model_path):
+    """The Vosk model at model_path, loaded once per process and shared by every recognizer."""
+    from vosk import Model
+    return Model(model_path)
+
+
+@functools.lru_cache(maxsize=2)
+def load_templates(template_dir):
+    """(command, MFCC features) of every recorded template, read once per process."""
+    templates = []
+    for path in sorted(glob.glob(os.path.join(template_dir, "*.wav"))):
+        command = os.path.basename(path).split("_")[0].split(".")[0]
+        if command not in COMMANDS:
+            continue
+        with wave.open(path, "rb") as reader:
+            pcm = reader.readframes(reader.getnframes())
+            templates.append((command, mfcc(pcm, reader.getframerate())))
+    if not templates:
+        raise Exception(f"No command templates found in {template_dir}")
+    return tuple(templates)
+
+
+class CommandRecognizer:
+    """Interface: recognize() maps one utterance to text; streaming recognizers use accept().
+
+    Streaming recognizers keep state between frames, so every CommandListener
+    needs an instance of its own (create_recognizer() is cheap once the model
+    or templates have been loaded).
+
+    Non-streaming recognizers receive utterances cut by voice_control's energy
+    detector after `hangover_ms` of silence. Streaming recognizers see every
+    frame and may report a command before the speaker has finished.
+    """
+
+    name = "base"
+    label = "Base"
+    offline = True
+    streaming = False
+    hangover_ms = HANGOVER_MS
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def recognize(self, pcm, sample_rate):
+        raise NotImplementedError
+
+    def accept(self, frame, sample_rate):
+        raise NotImplementedError
+
+
+class GoogleRecognizer(CommandRecognizer):
+    """Google's web speech API through speech_recognition (needs network access)."""
+
+    name = "google"
+    label = "Google Speech (online)"
+    offline = False
+
+    def __init__(self):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+
+    @classmethod
+    def available(cls):
+        try:
+            import speech_recognition  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def recognize(self, pcm, sample_rate):
+        try:
+            return self._recognizer.recognize_google(self._sr.AudioData(pcm, sample_rate, 2))
+        except self._sr.UnknownValueError:
+            return ""
+        except self._sr.RequestError as e:
+            print(f"❌ Error with speech recognition service: {e}")
+            return ""
+
+
+class VoskRecognizer(CommandRecognizer):
+    """Vosk (Kaldi) restricted to the command words; reports a word as soon as it is decoded."""
+
+    name = "vosk"
+    label = "Vosk keywords (offline)"
+    streaming = True
+
+    def __init__(self, model_path=VOSK_MODEL):
+        # The model is shared; the KaldiRecognizers holding a stream's partial hypothesis are this instance's own
+        self._model = load_vosk_model(model_path)
+        self._recognizers = {}
+
+    @classmethod
+    def available(cls):
+        try:
+            import vosk  # noqa: F401
+        except ImportError:
+            return False
+        return bool(VOSK_MODEL) and os.path.isdir(VOSK_MODEL)
+
+    def _recognizer(self, sample_rate):
+        if sample_rate not in self._recognizers:
+            from vosk import KaldiRecognizer
+            # The grammar keeps the search space to the command words; everything else is [unk]
+            grammar = json.dumps(list(COMMANDS) + ["[unk]"])
+            self._recognizers[sample_rate] = KaldiRecognizer(self._model, sample_rate, grammar)
+        return self._recognizers[sample_rate]
+
+    def accept(self, frame, sample_rate):
+        recognizer = self._recognizer(sample_rate)
+        if recognizer.AcceptWaveform(frame):
+            text = json.loads(recognizer.Result()).get("text", "")
+        else:
+            text = json.loads(recognizer.PartialResult()).get("partial", "")
+        if parse_command(text):
+            # Fire on the partial hypothesis and start over for the next command
+            recognizer.Reset()
+            return text
+        return None
+
+    def recognize(self, pcm, sample_rate):
+        recognizer = self._recognizer(sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        recognizer.Reset()
+        return text
+
+
+@functools.lru_cache(maxsize=8)
+def _mel_filterbank(sample_rate, n_fft, n_mels):
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    mels = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / sample_rate).astype(int)
+    bank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            bank[m - 1, k] = (k - left) / max(1, center - left)
+        for k in range(center, right):
+            bank[m - 1, k] = (right - k) / max(1, right - center)
+    return bank
+
+
+@functools.lru_cache(maxsize=4)
+def _dct_matrix(n_mfcc, n_mels):
+    n = np.arange(n_mels)
+    return np.cos(np.pi / n_mels * (n[None, :] + 0.5) * np.arange(n_mfcc)[:, None]).astype(np.float32)
+
+
+def mfcc(pcm, sample_rate, n_mfcc=13, n_mels=26):
+    """MFCC features (25 ms windows, 10 ms hop) with cepstral mean normalization."""
+    x = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    x = np.append(x[:1], x[1:] - 0.97 * x[:-1])
+    frame = int(sample_rate * 0.025)
+    hop = int(sample_rate * 0.010)
+    n_fft = 1 << (frame - 1).bit_length()
+    if len(x) < frame:
+        x = np.pad(x, (0, frame - len(x)))
+    count = 1 + (len(x) - frame) // hop
+    index = np.arange(frame)[None, :] + hop * np.arange(count)[:, None]
+    frames = x[index] * np.hamming(frame).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2 / n_fft
+    log_mel = np.log(power @ _mel_filterbank(sample_rate, n_fft, n_mels).T + 1e-10)
+    features = log_mel @ _dct_matrix(n_mfcc, n_mels).T
+    return features - features.mean(axis=0)
+
+
+def dtw_distance(a, b):
+    """Dynamic time warping distance between two feature sequences, per aligned frame."""
+    if len(a) > len(b):
+        # The distance is symmetric: loop over the shorter sequence, vectorize along the longer one
+        a, b = b, a
+    # Euclidean frame distances as |a|^2 + |b|^2 - 2ab, one matrix product instead of an (n, m, d) difference
+    cost = np.einsum("ij,ij->i", a, a)[:, None] + np.einsum("ij,ij->i", b, b)[None, :] - 2 * (a @ b.T)
+    np.sqrt(np.maximum(cost, 0, out=cost), out=cost)
+    n, m = cost.shape
+    previous = np.full(m + 1, np.inf)
+    previous[0] = 0.0
+    current = np.empty(m + 1)
+    steps = np.empty(m + 1)
+    steps[0] = 0.0
+    for i in range(n):
+        current[0] = np.inf
+        # D[j] = cost[j] + min(diagonal/vertical[j], D[j-1]) unrolls to
+        # D[j] = steps[j] + min over k <= j of (diagonal/vertical[k] - steps[k-1]), steps being the row's prefix sums
+        np.cumsum(cost[i], out=steps[1:])
+        entry = np.minimum(previous[1:], previous[:-1])
+        current[1:] = steps[1:] + np.minimum.accumulate(entry - steps[:-1])
+        previous, current = current, previous
+    return previous[m] / (n + m)
+
+
+class TemplateRecognizer(CommandRecognizer):
+    """Nearest recorded example by DTW over MFCCs; no model download and no network."""
+
+    name = "template"
+    label = "Recorded templates (offline)"
+    hangover_ms = 150
+
+    def __init__(self, template_dir=VOICE_TEMPLATE_DIR, max_distance=TEMPLATE_MAX_DISTANCE,
+                 max_ratio=TEMPLATE_MAX_RATIO):
+        self.max_distance = max_distance
+        self.max_ratio = max_ratio
+        self.templates = load_templates(template_dir)
+
+    @classmethod
+    def available(cls):
+        return bool(glob.glob(os.path.join(VOICE_TEMPLATE_DIR, "*.wav")))
+
+    def recognize(self, pcm, sample_rate):
+        features = mfcc(pcm, sample_rate)
+        distances = {}
+        for command, template in self.templates:
+            distance = dtw_distance(features, template)
+            distances[command] = min(distance, distances.get(command, np.inf))
+        ranked = sorted(distances.items(), key=lambda item: item[1])
+        best, best_distance = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else np.inf
+        if best_distance > self.max_distance or best_distance > self.max_ratio * runner_up:
+            return ""
+        return best
+
+
+RECOGNIZERS = {
+    VoskRecognizer.name: VoskRecognizer,
+    TemplateRecognizer.name: TemplateRecognizer,
+    GoogleRecognizer.name: GoogleRecognizer,
+}
+
+
+def register_recognizer(recognizer_class):
+    """Registers an additional CommandRecognizer subclass under its name."""
+    RECOGNIZERS[recognizer_class.name] = recognizer_class
+    return recognizer_class
+
+
+def create_recognizer(name=VOICE_RECOGNIZER):
+    """A new instance of the named recognizer, for one listener; "auto" prefers the offline ones."""
+    if name == "auto":
+        for recognizer_class in RECOGNIZERS.values():
+            if recognizer_class.available():
+                return recognizer_class()
+        raise Exception("No speech recognizer is available")
+    if name not in RECOGNIZERS:
+        raise ValueError(f"Unknown speech recognizer: {name}")
+    return RECOGNIZERS[name]()
+
+
+def record_templates(template_dir=VOICE_TEMPLATE_DIR, repeats=TEMPLATES_PER_COMMAND):
+    """Records a few examples of every command word from the microphone."""
+    from voice_control import MicrophoneSource, UtteranceDetector
+
+    os.makedirs(template_dir, exist_ok=True)
+    source = MicrophoneSource()
+    detector = UtteranceDetector(source.sample_rate, source.frame_ms)
+    frames = iter(source)
+    print("🤫 Stay quiet for a second while the microphone calibrates...")
+    while detector.threshold is None:
+        detector.feed(next(frames))
+
+    try:
+        for command in COMMANDS:
+            for n in range(repeats):
+                print(f"🎤 Say \"{command}\" ({n + 1}/{repeats})")
+                utterance = None
+                while utterance is None:
+                    utterance = detector.feed(next(frames))
+                path = os.path.join(template_dir, f"{command}_{n}.wav")
+                with wave.open(path, "wb") as writer:
+                    writer.setnchannels(1)
+                    writer.setsampwidth(2)
+                    writer.setframerate(source.sample_rate)
+                    writer.writeframes(utterance)
+                print(f"✅ Saved {path}")
+    finally:
+        source.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["record"]:
+        record_templates()
+    else:
+        print(__doc__)
@@ -0,0 +1,237 @@
+"""UI-free OCR and speech helpers shared by the batch CLI, the HTTP service and the web pages."""
+import time
+
+import cv2
+import numpy as np
+
+import profiling
+from audio_stream import encode_stream, read_blocks
+from documents import document_key, iter_pages, ocr_pages
+from ocr_cache import get_ocr_cache, image_key
+from ocr_engine import DEFAULT_OCR_CONFIG, DEFAULT_OCR_LANG, get_engine_pool
+from ocr_layout import recognize_tiled
+from preprocess import get_pipeline
+from tts_cache import audio_key, get_tts_cache
+from tts_engine import TTS_ENGINE, get_tts_engine
+from tts_pipeline import SentencePipeline, split_sentences
+
+
+def decode_image(data):
+    """Decodes encoded image bytes (PNG/JPEG/...) into a BGR array, or None if unreadable."""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def extract_text(image, order="bgr", timings=None):
+    """OCRs a decoded image through the shared preprocessing pipeline, engine pool and cache.
+
+    Per-stage preprocessing seconds are added to `timings` (as "preprocess.<stage>")
+    when OCR actually runs; returns (text, scale) where scale is None on a cache hit.
+    """
+    pipeline = get_pipeline(order)
+    key = image_key(image, DEFAULT_OCR_CONFIG, pipeline.signature(), DEFAULT_OCR_LANG)
+    stage_timings = {}
+    text = get_ocr_cache().get_or_compute(
+        key, lambda: get_engine_pool().recognize(pipeline.run(image, stage_timings)).strip())
+    if timings is not None:
+        for stage, seconds in stage_timings.items():
+            timings[f"preprocess.{stage}"] = seconds
+    return text, (pipeline.last_scale if stage_timings else None)
+
+
+def recognize_image(image, pipeline, pool, on_note=None, dpi=None,
+                    config=DEFAULT_OCR_CONFIG, lang=DEFAULT_OCR_LANG):
+    """OCRs a PIL image or RGB array with a pipeline and engine pool built beforehand.
+
+    Large pages are split into line regions OCR'd in parallel. The DPI is read from
+    the image when not given; `on_note` is told when the image had to be rescaled.
+    """
+    img_array = np.asarray(image)
+    dpi = dpi or getattr(image, "info", {}).get("dpi", (None,))[0]
+    key = image_key(img_array, config, f"{pipeline.signature()}|dpi={dpi}", lang)
+
+    def run_ocr():
+        processed = pipeline.run(img_array, dpi=dpi)
+        scale = pipeline.last_scale
+        if scale != 1.0 and on_note is not None:
+            on_note(f"🔍 Image rescaled ×{scale:.2f} for OCR "
+                    f"({img_array.shape[1]}×{img_array.shape[0]} → {processed.shape[1]}×{processed.shape[0]})")
+        return recognize_tiled(processed, pool).strip()
+
+    return get_ocr_cache().get_or_compute(key, run_ocr)
+
+
+def extract_text_from_bytes(data):
+    """Decodes and OCRs an uploaded image; top-level so it can run in a worker process."""
+    try:
+        return _extract_text_from_bytes(data)
+    except ValueError:
+        raise
+    except Exception as e:
+        # Re-raise as a plain exception: some library errors cannot be pickled back to the parent
+        raise RuntimeError(f"{type(e).__name__}: {str(e)}") from None
+
+
+def _extract_text_from_bytes(data):
+    timings = {}
+    t0 = time.perf_counter()
+    image = decode_image(data)
+    if image is None:
+        raise ValueError("Unable to decode image")
+    timings["decode"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    text, scale = extract_text(image, "bgr", timings)
+    timings["ocr"] = time.perf_counter() - t0
+    return {"text": text, "scale": scale, "timings": timings}
+
+
+def text_to_speech(text, lang="en", engine=TTS_ENGINE):
+    """Returns audio bytes for text from the named engine, served from the TTS cache when possible."""
+    tts_engine = get_tts_engine(engine)
+    return get_tts_cache().get_or_synthesize(
+        text, lambda: tts_engine.synthesize(text, lang), lang=lang, engine=engine, ext=tts_engine.format)
+
+
+def speech_chunks(text, lang="en", engine=TTS_ENGINE, synthesize=text_to_speech):
+    """Yields one audio clip per sentence, synthesized a few sentences ahead in parallel."""
+    with SentencePipeline(split_sentences(text), lambda sentence: synthesize(sentence, lang, engine)) as pipeline:
+        for _, _, audio in pipeline:
+            yield audio
+
+
+def speech_path(text, lang="en", engine=TTS_ENGINE):
+    """Path of the cached audio file for a whole text (present once stream_speech() has completed)."""
+    return get_tts_cache().path_for(audio_key(text, lang, engine), get_tts_engine(engine).format)
+
+
+def stream_speech(text, lang="en", engine=TTS_ENGINE, synthesize=text_to_speech):
+    """Yields the audio for a whole text as one continuous stream of encoded chunks.
+
+    The stream is written to the TTS cache in the same pass, so a repeated request
+    is streamed back from disk in blocks instead of being synthesized again.
+    """
+    fmt = get_tts_engine(engine).format
+    cache = get_tts_cache()
+    key = audio_key(text, lang, engine)
+    cached = cache.open(key, fmt)
+    if cached is not None:
+        yield from read_blocks(cached)
+        return
+    chunks = speech_chunks(text, lang, engine, synthesize)
+    yield from cache.put_stream(key, encode_stream(chunks, fmt), fmt)
+
+
+def stream_pages_speech(page_texts, key, lang="en", engine=TTS_ENGINE, synthesize=text_to_speech):
+    """Like stream_speech() for text that arrives a page at a time (e.g. from documents.ocr_pages()).
+
+    Each page is spoken as soon as its text arrives, so audio for page 1 streams
+    while later pages are still being recognized. The stream is cached under `key`.
+    """
+    fmt = get_tts_engine(engine).format
+
+    def chunks():
+        for text in page_texts:
+            if text:
+                yield from speech_chunks(text, lang, engine, synthesize)
+
+    yield from get_tts_cache().put_stream(key, encode_stream(chunks(), fmt), fmt)
+
+
+def image_job_stages(image, ocr, engine=TTS_ENGINE, record=None, after_speech=None):
+    """OCR and speech stages of a jobs.JobManager job converting one image.
+
+    `ocr(image, on_note, dpi)` returns the image's text. The stages run on worker
+    threads, so it should only use OCR resources built before the job is submitted.
+    The first audio chunk, the audio path and the finished timing `record` are
+    stored in the job's result; `after_speech(job, text)` runs once the audio is complete.
+    """
+    def ocr_stage(job):
+        with profiling.span("ocr"):
+            return ocr(image, job.note, None)
+
+    def tts_stage(job, text):
+        # Stream the speech sentence by sentence into the audio file; the first
+        # sentence is playable while the rest are still being synthesized
+        sentences = max(1, len(split_sentences(text)))
+        stream = stream_speech(text, engine=engine)
+        try:
+            with profiling.span("tts.stream"):
+                for i, chunk in enumerate(stream):
+                    if i == 0:
+                        job.result["first_chunk"] = chunk
+                    job.report((i + 1) / sentences)
+                    job.check_cancelled()
+        finally:
+            stream.close()
+        job.result["audio_path"] = speech_path(text, engine=engine)
+        if after_speech is not None:
+            after_speech(job, text)
+        if record is not None:
+            job.result["timings"] = profiling.finish(record).as_dict()
+
+    return ocr_stage, tts_stage
+
+
+def document_job_stages(data, pages, ocr, engine=TTS_ENGINE, record=None):
+    """OCR and speech stages of a jobs.JobManager job converting a multi-page PDF/TIFF.
+
+    The OCR stage ends as soon as the first page with text is read, so its speech
+    starts right away; the remaining pages keep being OCR'd in parallel
+    (PAGE_OCR_WORKERS) while the audio is produced. `pages` is the number of pages
+    progress is counted against, and `ocr` is as for image_job_stages().
+    """
+    def extract_page(image, dpi):
+        with profiling.span("ocr.page"):
+            return ocr(image, None, dpi)
+
+    def ocr_stage(job):
+        page_texts = ocr_pages(iter_pages(data), extract_page)
+        job.result["page_texts"] = page_texts
+        # Closes the document and page workers if the job is cancelled while waiting for a TTS worker
+        job.on_cancel(page_texts.close)
+        job.result["texts"] = []
+        try:
+            for page_number, text in page_texts:
+                job.result["page"] = page_number
+                job.report(page_number / pages)
+                job.check_cancelled()
+                if text:
+                    job.result["texts"].append(text)
+                    return text
+        except BaseException:
+            # Stops the page workers; on success they keep going for the speech stage
+            page_texts.close()
+            raise
+        return ""
+
+    def tts_stage(job, text):
+        texts = job.result["texts"]
+
+        def remaining_pages():
+            yield text
+            for page_number, page_text in job.result["page_texts"]:
+                job.result["page"] = page_number
+                job.check_cancelled()
+                if page_text:
+                    texts.append(page_text)
+                    yield page_text
+
+        key = audio_key(f"document:{document_key(data)}", "en", engine)
+        stream = stream_pages_speech(remaining_pages(), key, engine=engine)
+        try:
+            with profiling.span("tts.stream"):
+                for i, chunk in enumerate(stream):
+                    if i == 0:
+                        job.result["first_chunk"] = chunk
+                    job.report(job.result["page"] / pages)
+                    job.check_cancelled()
+        finally:
+            stream.close()
+            job.result["page_texts"].close()
+        job.result["text"] = "\n\n".join(texts)
+        job.result["audio_path"] = get_tts_cache().path_for(key, get_tts_engine(engine).format)
+        # No editable transcript for documents: it would track every sentence of up to MAX_DOCUMENT_PAGES pages
+        if record is not None:
+            job.result["timings"] = profiling.finish(record).as_dict()
+
+    return ocr_stage, tts_stage
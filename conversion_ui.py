@@ -0,0 +1,209 @@
+"""Streamlit widgets shared by the web pages (streamlit.py and streamlit2.py).
+
+The conversion itself runs as a background job (conversion.image_job_stages()
+and conversion.document_job_stages()); these helpers submit it, wait for it and
+show its result. Each page passes in how its audio section is drawn.
+"""
+import os
+
+import streamlit as st
+
+import profiling
+from conversion import document_job_stages, image_job_stages, recognize_image
+from documents import MAX_DOCUMENT_PAGES, page_count
+from jobs import CANCELLED, FAILED, FINISHED, OCR, QUEUED
+from startup import job_manager, load_ocr, load_output_dir, load_tts_engines, session_id
+from tts_engine import TTS_ENGINE, TTS_ENGINES, get_tts_engine
+
+# OCR settings (also part of the OCR cache key)
+OCR_CONFIG = r'--oem 3 --psm 6'
+OCR_LANG = 'eng'
+# How often a running conversion's progress is refreshed (sooner when it changes)
+JOB_POLL_SECONDS = 0.5
+
+
+def image_ocr():
+    """OCR for conversion jobs, with the pipeline and Tesseract pool resolved in the script thread.
+
+    load_ocr() is an st.cache_resource function, so it is not called from the job workers.
+    """
+    preprocess_pipeline, ocr_pool = load_ocr('rgb', OCR_LANG, OCR_CONFIG)
+    return lambda image, on_note, dpi: recognize_image(image, preprocess_pipeline, ocr_pool, on_note, dpi,
+                                                       OCR_CONFIG, OCR_LANG)
+
+
+def timings_enabled():
+    # Conversions are timed per stage when PROFILING=1 or the sidebar box is ticked
+    return st.sidebar.checkbox("⏱️ Show timings", value=profiling.PROFILING, key="show_timings")
+
+
+def show_timings():
+    # Per-stage breakdown of this session's last conversion
+    record = st.session_state.get('timing_record')
+    if not st.session_state.get('show_timings') or record is None:
+        return
+    with st.sidebar.expander("⏱️ Timings", expanded=True):
+        st.caption(f"{record['entry']} · {record['total']:.2f} s end to end")
+        st.table({"stage": list(record['stages']),
+                  "seconds": [round(seconds, 3) for seconds in record['stages'].values()]})
+
+
+def select_tts_engine():
+    # Offline engines appear only when installed on this machine
+    engines = load_tts_engines() or [TTS_ENGINE]
+    return st.sidebar.selectbox(
+        "🗣️ Voice Engine",
+        engines,
+        index=engines.index(TTS_ENGINE) if TTS_ENGINE in engines else 0,
+        format_func=lambda name: TTS_ENGINES[name].label,
+        help="Offline engines work without a network connection"
+    )
+
+
+def select_source(upload):
+    # A new upload or photo starts fresh: the previous conversion is cancelled and no longer shown
+    source = getattr(upload, 'file_id', None) or f"{upload.name}:{upload.size}"
+    if st.session_state.get('job_source') == source:
+        return
+    st.session_state['job_source'] = source
+    job_id = st.session_state.pop('job_id', None)
+    if job_id is not None:
+        job_manager().cancel(job_id)
+    st.session_state.pop('transcript', None)
+
+
+def submit_conversion(image, engine=TTS_ENGINE, profile=False, after_speech=None):
+    # OCR and speech run on the shared job workers (OCR_JOB_WORKERS / TTS_JOB_WORKERS), so a burst
+    # of conversions waits in line instead of all running at once; returns the job id
+    load_output_dir()
+    record = profiling.start("streamlit", enabled=profile, engine=engine)
+    ocr, tts = image_job_stages(image, image_ocr(), engine, record, after_speech)
+
+    with profiling.use(record):
+        # The result is shown with the engine it was made with, even if the sidebar changes later
+        return job_manager().submit(session_id(), ocr, tts, result={'engine': engine})
+
+
+def process_document(data, name, show_audio, engine=TTS_ENGINE, profile=False):
+    # Multi-page PDF/TIFF: pages are rasterized and read one at a time, never all at once
+    try:
+        pages = page_count(data)
+    except Exception as e:
+        st.error(f"Unable to open {name}: {str(e)}")
+        return
+    st.markdown("""
+        <div style='background: rgba(255,255,255,0.05); padding: 1rem; border-radius: 15px; margin: 1rem 0;'>
+            <h4 style='color: #4facfe; margin-bottom: 1rem;'>📚 Document</h4>
+        </div>
+    """, unsafe_allow_html=True)
+    st.caption(f"📄 {name}: {pages} page(s)")
+    if pages > MAX_DOCUMENT_PAGES:
+        # iter_pages() stops there, so progress is counted against the pages actually read
+        st.warning(f"Only the first {MAX_DOCUMENT_PAGES} of {pages} pages will be read (MAX_DOCUMENT_PAGES).")
+        pages = MAX_DOCUMENT_PAGES
+
+    if st.button('✨ Convert to Text and Speech ✨'):
+        try:
+            st.session_state['job_id'] = submit_document_conversion(data, pages, engine, profile)
+        except Exception as e:
+            st.error(f"Error starting conversion: {str(e)}")
+
+    show_conversion(show_audio)
+
+
+def submit_document_conversion(data, pages, engine=TTS_ENGINE, profile=False):
+    # Speech for the first page starts while later pages are still being read; returns the job id
+    load_output_dir()
+    record = profiling.start("streamlit", enabled=profile, engine=engine, pages=pages)
+    ocr, tts = document_job_stages(data, pages, image_ocr(), engine, record)
+
+    with profiling.use(record):
+        # The result is shown with the engine it was made with, even if the sidebar changes later
+        return job_manager().submit(session_id(), ocr, tts, result={'engine': engine})
+
+
+def wait_for_conversion(job, player, audio_format):
+    # Polls the job until it finishes, showing its place in line and progress
+    progress = st.empty()
+    status = job_manager().status(job.id)
+    while status['status'] not in FINISHED:
+        if status['status'] == QUEUED:
+            label = f"⏳ Waiting for a free worker ({status['position']} ahead)"
+        elif status['stage'] == OCR:
+            label = "🔍 Reading your notes..."
+        else:
+            label = "🎙️ Generating audio..."
+        if 'page' in job.result:
+            label += f" (page {job.result['page']})"
+        progress.progress(status['progress'], text=label)
+        if 'first_chunk' in job.result:
+            player.audio(job.result['first_chunk'], format=audio_format)
+        job.wait(status['version'], timeout=JOB_POLL_SECONDS)
+        status = job_manager().status(job.id)
+    progress.empty()
+    return status
+
+
+def show_conversion(show_audio):
+    # Result of this session's latest conversion (waits for it while it is still running);
+    # the page draws the audio section with show_audio(job, text, audio_path)
+    job = job_manager().get(st.session_state.get('job_id'))
+    if job is None:
+        return
+    audio_format = get_tts_engine(job.result['engine']).mime
+    player = st.empty()
+    status = wait_for_conversion(job, player, audio_format)
+    player.empty()
+
+    for note in status['notes']:
+        st.caption(note)
+    if 'timings' in job.result:
+        st.session_state['timing_record'] = job.result['timings']
+    if status['status'] == CANCELLED:
+        st.warning("Conversion was cancelled.")
+        return
+    if status['status'] == FAILED:
+        st.error(f"Error generating audio: {status['error']}")
+        return
+
+    text = job.result.get('text')
+    if not text:
+        st.error("No text could be extracted from the image. Please try with a clearer image.")
+        return
+
+    # Display extracted text with custom styling
+    st.markdown("""
+        <div style='background: rgba(255,255,255,0.05); padding: 1.5rem; border-radius: 15px; margin: 1rem 0;'>
+            <h4 style='color: #4facfe; margin-bottom: 1rem;'>📝 Extracted Text</h4>
+        </div>
+    """, unsafe_allow_html=True)
+    st.markdown(f"<div style='padding: 1rem; background: rgba(255,255,255,0.02); border-radius: 10px;'>{text}</div>", unsafe_allow_html=True)
+
+    if 'transcript' in job.result:
+        st.session_state['transcript'] = job.result['transcript']
+
+    # Audio is played from the finished file rather than an in-memory copy
+    audio_path = job.result.get('audio_path')
+    if audio_path and os.path.exists(audio_path):
+        show_audio(job, text, audio_path)
+
+
+def download_audio(audio_path, engine, **kwargs):
+    # Stylish download button for a finished audio file
+    tts_engine = get_tts_engine(engine)
+    with open(audio_path, 'rb') as audio_file:
+        st.download_button(
+            label='💾 Download',
+            data=audio_file,
+            file_name=f'handwriting_audio.{tts_engine.format}',
+            mime=tts_engine.mime,
+            **kwargs
+        )
+
+
+def show_success():
+    st.markdown("""
+        <div class='success'>
+            ✨ Audio generated successfully! Click play to listen or download to save.
+        </div>
+    """, unsafe_allow_html=True)
@@ -0,0 +1,120 @@
+"""Multi-page documents (PDF, TIFF) rasterized and OCR'd page by page.
+
+iter_pages() is a generator: a page is rasterized only when the consumer asks
+for it, so a 200-page scan never sits in memory as 200 bitmaps. ocr_pages()
+keeps PAGE_OCR_WORKERS pages in flight on a thread pool and yields their text
+in page order as soon as each is ready, so speech for page 1 can start while
+later pages are still being rasterized and recognized. At most
+PAGE_OCR_WORKERS + 1 page bitmaps exist at any moment, whatever the page count.
+
+PDFs need pypdfium2 (imported only when a PDF is opened); TIFFs are read
+frame by frame with Pillow.
+"""
+import contextvars
+import hashlib
+import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from sysinfo import available_cores
+
+DOCUMENT_EXTENSIONS = (".pdf", ".tif", ".tiff")
+# Resolution PDF pages are rasterized at (scanned text is usually 200-300 DPI)
+DOCUMENT_DPI = int(os.environ.get("DOCUMENT_DPI", "200"))
+# Resolutions below this in TIFF metadata are placeholders, not real scan DPI
+MIN_DPI = 50
+# Pages OCR'd at the same time; they share the OCR engine pool
+PAGE_OCR_WORKERS = int(os.environ.get("PAGE_OCR_WORKERS", str(min(4, available_cores()))))
+# Pages read from one document (the rest are left out) so a huge upload cannot tie up the workers indefinitely
+MAX_DOCUMENT_PAGES = int(os.environ.get("MAX_DOCUMENT_PAGES", "500"))
+
+
+def is_document(name):
+    return name.lower().endswith(DOCUMENT_EXTENSIONS)
+
+
+def _is_pdf(data):
+    return data[:5] == b"%PDF-"
+
+
+def _open_pdf(data):
+    try:
+        import pypdfium2
+    except ImportError:
+        raise Exception("PDF support needs pypdfium2: pip install pypdfium2")
+    return pypdfium2.PdfDocument(data)
+
+
+def document_key(data):
+    """Content hash of a document's bytes (names its cached audio)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_count(data):
+    """Number of pages in a PDF or TIFF given as bytes (any other image counts as one)."""
+    if _is_pdf(data):
+        pdf = _open_pdf(data)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with Image.open(io.BytesIO(data)) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def iter_pages(data, dpi=DOCUMENT_DPI, max_pages=MAX_DOCUMENT_PAGES):
+    """Yields (page_number, RGB array, dpi) for each page, rasterizing one page per step."""
+    if _is_pdf(data):
+        pdf = _open_pdf(data)
+        try:
+            for index in range(min(len(pdf), max_pages)):
+                page = pdf[index]
+                try:
+                    bitmap = page.render(scale=dpi / 72)
+                    pixels = np.asarray(bitmap.to_pil().convert("RGB"))
+                finally:
+                    page.close()
+                yield index + 1, pixels, dpi
+        finally:
+            pdf.close()
+        return
+
+    with Image.open(io.BytesIO(data)) as image:
+        for index, frame in enumerate(ImageSequence.Iterator(image)):
+            if index >= max_pages:
+                break
+            frame_dpi = frame.info.get("dpi", (None,))[0]
+            # Some writers store a placeholder resolution (e.g. 1 DPI); treat it as unknown
+            frame_dpi = int(frame_dpi) if frame_dpi and frame_dpi >= MIN_DPI else None
+            yield index + 1, np.asarray(frame.convert("RGB")), frame_dpi
+
+
+def ocr_pages(pages, extract, workers=PAGE_OCR_WORKERS):
+    """Runs extract(image, dpi) on pages from iter_pages() in parallel; yields (page_number, text) in order.
+
+    Only `workers` pages are submitted ahead of the one being yielded, so the
+    next page is rasterized while the previous ones are recognized and memory
+    stays bounded. Closing the generator early cancels the pages not started.
+    """
+    workers = max(1, workers)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-ocr")
+    pending = deque()
+    try:
+        for page_number, image, dpi in pages:
+            # Run in a copy of the caller's context so profiling spans reach the caller's request
+            pending.append((page_number, executor.submit(contextvars.copy_context().run, extract, image, dpi)))
+            del image
+            if len(pending) >= workers:
+                page_number, future = pending.popleft()
+                yield page_number, future.result()
+        while pending:
+            page_number, future = pending.popleft()
+            yield page_number, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -0,0 +1,96 @@
+"""Picks the sharpest of the recent webcam frames for OCR.
+
+A FrameSelector keeps the last CAPTURE_FRAMES frames in a preallocated ring and
+scores each one with the variance of its Laplacian, measured on a small
+grayscale copy (SHARPNESS_WIDTH pixels wide) so scoring costs well under a
+millisecond per frame. When the user captures, the sharpest recent frame goes
+to OCR instead of whichever frame happened to be on screen.
+
+For hands-free capture it also tracks whether the page is steady: the mean
+pixel change between consecutive small copies stays under STABLE_DIFF for
+STABLE_FRAMES frames in a row while the score is above AUTO_CAPTURE_SHARPNESS.
+"""
+import os
+
+import cv2
+import numpy as np
+
+# Recent frames kept to choose from (~half a second at 30 fps)
+CAPTURE_FRAMES = int(os.environ.get("CAPTURE_FRAMES", "15"))
+# Width of the grayscale copy used for scoring and motion checks
+SHARPNESS_WIDTH = int(os.environ.get("SHARPNESS_WIDTH", "320"))
+# Capture automatically once the page is steady and sharp (CLI webcam mode)
+AUTO_CAPTURE = os.environ.get("AUTO_CAPTURE", "0") == "1"
+# Minimum Laplacian variance for an automatic capture
+AUTO_CAPTURE_SHARPNESS = float(os.environ.get("AUTO_CAPTURE_SHARPNESS", "150"))
+# Mean absolute pixel change (0-255) below which consecutive frames count as steady
+STABLE_DIFF = float(os.environ.get("STABLE_DIFF", "2.5"))
+STABLE_FRAMES = int(os.environ.get("STABLE_FRAMES", "10"))
+
+
+def small_gray(frame, width=SHARPNESS_WIDTH):
+    """A downsampled grayscale copy of a BGR (or already gray) frame."""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    height, full_width = gray.shape
+    if full_width <= width:
+        return gray
+    return cv2.resize(gray, (width, max(1, height * width // full_width)), interpolation=cv2.INTER_AREA)
+
+
+def sharpness(gray):
+    """Variance of the Laplacian: high for crisp edges, low for motion blur or bad focus."""
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+class FrameSelector:
+    """Ring buffer of recent frames with their sharpness; not thread-safe (one capture loop)."""
+
+    def __init__(self, size=CAPTURE_FRAMES, width=SHARPNESS_WIDTH):
+        self.size = max(1, size)
+        self.width = width
+        self.scores = np.zeros(self.size, dtype=np.float32)
+        self.count = 0
+        self.steady = 0
+        self._frames = None
+        self._next = 0
+        self._previous = None
+
+    def add(self, frame):
+        """Scores a frame and copies it into the ring; returns its sharpness."""
+        if self._frames is None or self._frames.shape[1:] != frame.shape:
+            # Allocated once for the camera's frame size; later frames are copied in place
+            self._frames = np.empty((self.size,) + frame.shape, dtype=frame.dtype)
+            self.reset()
+        gray = small_gray(frame, self.width)
+        score = sharpness(gray)
+
+        if self._previous is not None and cv2.absdiff(gray, self._previous).mean() < STABLE_DIFF:
+            self.steady += 1
+        else:
+            self.steady = 0
+        self._previous = gray
+
+        np.copyto(self._frames[self._next], frame)
+        self.scores[self._next] = score
+        self._next = (self._next + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        return score
+
+    def best(self):
+        """(copy of the sharpest buffered frame, its score), or (None, 0.0) when empty."""
+        if not self.count:
+            return None, 0.0
+        index = int(np.argmax(self.scores[:self.count]))
+        return self._frames[index].copy(), float(self.scores[index])
+
+    def ready(self, min_sharpness=AUTO_CAPTURE_SHARPNESS, stable_frames=STABLE_FRAMES):
+        """True once the page has been steady for `stable_frames` frames and a buffered frame is sharp enough."""
+        return (self.steady >= stable_frames and self.count > 0
+                and float(self.scores[:self.count].max()) >= min_sharpness)
+
+    def reset(self):
+        self.scores[:] = 0
+        self.count = 0
+        self.steady = 0
+        self._next = 0
+        self._previous = None
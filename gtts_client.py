@@ -0,0 +1,177 @@
+"""Pooled HTTP client for Google TTS: keep-alive sessions, parallel chunk fetches, retries and rate limiting.
+
+gTTS splits text into ~100 character parts and fetches them one after another,
+opening a new HTTPS connection for each. This client reuses gTTS for the
+tokenizing and request bodies but sends the parts itself:
+
+- one shared requests.Session, so connections stay open across parts, sentences and conversions
+- up to GTTS_CONCURRENCY parts of a text in flight at once, joined back in order
+- failed parts (connection errors, 429, 5xx) retried with exponential backoff
+- a token bucket per host (GTTS_RATE requests per second) so bursts don't get throttled
+
+Set GTTS_URL to point it at another endpoint, e.g. a local stub server
+(see benchmarks/gtts_client.py).
+"""
+import base64
+import os
+import random
+import re
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GTTS_TLD = os.environ.get("GTTS_TLD", "com")
+# Full batchexecute endpoint; defaults to translate.google.<GTTS_TLD>
+GTTS_URL = os.environ.get("GTTS_URL", "")
+# Parts of one text fetched in parallel (also the size of the connection pool)
+GTTS_CONCURRENCY = int(os.environ.get("GTTS_CONCURRENCY", "4"))
+GTTS_RETRIES = int(os.environ.get("GTTS_RETRIES", "3"))
+# First retry waits this many seconds, doubling on every further attempt
+GTTS_BACKOFF = float(os.environ.get("GTTS_BACKOFF", "0.5"))
+# Requests per second allowed to one host (0 disables the limiter)
+GTTS_RATE = float(os.environ.get("GTTS_RATE", "10"))
+GTTS_TIMEOUT = float(os.environ.get("GTTS_TIMEOUT", "10"))
+
+# Statuses worth retrying: throttled or a temporary server error
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+_AUDIO = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+
+def default_url(tld=GTTS_TLD):
+    return f"https://translate.google.{tld}/_/TranslateWebserverUi/data/batchexecute"
+
+
+class RateLimiter:
+    """Token bucket: acquire() blocks until a request may go out at `rate` per second (bursts up to `burst`)."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class GTTSClient:
+    """Fetches gTTS audio over one pooled session; safe to share between threads."""
+
+    def __init__(self, url=None, concurrency=GTTS_CONCURRENCY, retries=GTTS_RETRIES,
+                 backoff=GTTS_BACKOFF, rate=GTTS_RATE, timeout=GTTS_TIMEOUT):
+        self.url = url or GTTS_URL or default_url()
+        self.retries = retries
+        self.backoff = backoff
+        self.rate = rate
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self._session = requests.Session()
+        # Enough pooled connections per host for every fetch thread plus callers fetching directly
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency * 2)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="gtts")
+        self._limiters = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0}
+
+    def _limiter(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self.rate)
+            return self._limiters[host]
+
+    def bodies(self, text, lang="en", slow=False):
+        """The request bodies gTTS would send for `text`, one per part."""
+        from gtts import gTTS
+        return gTTS(text=text, lang=lang, slow=slow).get_bodies()
+
+    def fetch(self, body):
+        """Sends one part and returns its MP3 bytes, retrying temporary failures."""
+        from gtts import gTTS
+        limiter = self._limiter(self.url)
+        for attempt in range(self.retries + 1):
+            limiter.acquire()
+            retry_after = None
+            try:
+                with self._lock:
+                    self.stats["requests"] += 1
+                response = self._session.post(self.url, data=body, headers=gTTS.GOOGLE_TTS_HEADERS,
+                                              timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return self._audio(response.text)
+                error = Exception(f"{response.status_code} ({response.reason}) from TTS API")
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = Exception(f"Failed to connect to TTS API: {e}")
+            except requests.HTTPError as e:
+                raise Exception(f"TTS API request failed: {e}")
+            if attempt == self.retries:
+                raise error
+            with self._lock:
+                self.stats["retries"] += 1
+            time.sleep(self._delay(attempt, retry_after))
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # Exponential backoff with jitter so parallel parts don't retry in lockstep
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _audio(payload):
+        chunks = []
+        for line in payload.splitlines():
+            if "jQ1olc" in line:
+                match = _AUDIO.search(line)
+                if not match:
+                    raise Exception("No audio stream in TTS API response")
+                chunks.append(base64.b64decode(match.group(1).encode("ascii")))
+        if not chunks:
+            raise Exception("No audio stream in TTS API response")
+        return b"".join(chunks)
+
+    def synthesize(self, text, lang="en", slow=False):
+        """MP3 bytes for the whole text; its parts are fetched in parallel and joined in order."""
+        bodies = self.bodies(text, lang, slow)
+        if len(bodies) == 1:
+            return self.fetch(bodies[0])
+        return b"".join(self._executor.map(self.fetch, bodies))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gtts_client():
+    """Returns the shared client, so every conversion reuses its open connections."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GTTSClient()
+        return _client
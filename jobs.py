@@ -0,0 +1,303 @@
+"""Background conversion jobs with separate, bounded OCR and TTS worker pools.
+
+A conversion is submitted as two stage functions and gets a job id back right
+away. Jobs wait in a priority queue per stage (lower priority number first,
+then submission order); OCR_JOB_WORKERS threads run the OCR stage and
+TTS_JOB_WORKERS threads the speech stage, so a burst of conversions queues up
+instead of starting a Tesseract process and a synthesis stream per click. The
+UI polls a job's status and progress, and a session's jobs are cancelled when
+the session goes away.
+"""
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+
+from sysinfo import available_cores
+
+OCR_JOB_WORKERS = int(os.environ.get("OCR_JOB_WORKERS", str(available_cores())))
+TTS_JOB_WORKERS = int(os.environ.get("TTS_JOB_WORKERS", "4"))
+# Jobs allowed to wait (in either queue) before new submissions are refused
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", "32"))
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION = int(os.environ.get("JOB_RETENTION", "600"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+QUEUED = "queued"
+OCR = "ocr"
+TTS = "tts"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a stage function when its job has been cancelled."""
+
+
+class Job:
+    """State of one conversion; stage functions report progress and check for cancellation on it.
+
+    `result` is a dict the stage functions fill in (text, audio path, ...).
+    Every change bumps `version`, which wait() uses to wake pollers.
+    """
+
+    def __init__(self, session_id, priority, ocr, tts, context):
+        self.id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.priority = priority
+        self.status = QUEUED
+        self.stage = OCR
+        self.progress = 0.0
+        self.notes = []
+        self.result = {}
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.version = 0
+        self._ocr = ocr
+        self._tts = tts
+        self._context = context
+        self._cancelled = threading.Event()
+        self._cleanups = []
+        self._cond = threading.Condition()
+
+    def _update(self, **fields):
+        with self._cond:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self._cond.notify_all()
+
+    def report(self, progress):
+        """Sets the fraction (0-1) of the current stage that is done."""
+        self._update(progress=max(0.0, min(1.0, progress)))
+
+    def note(self, message):
+        """Adds a message for the UI (e.g. how the image was rescaled)."""
+        with self._cond:
+            self.notes.append(message)
+        self._update()
+
+    def on_cancel(self, cleanup):
+        """Registers cleanup() for resources a stage leaves in `result` for the next one (e.g. an open document).
+
+        It runs if the job is cancelled or fails while no stage function is running
+        to release them, e.g. while the job waits in the TTS queue.
+        """
+        with self._cond:
+            self._cleanups.append(cleanup)
+
+    def _clean_up(self):
+        with self._cond:
+            cleanups, self._cleanups = self._cleanups, []
+        for cleanup in cleanups:
+            try:
+                cleanup()
+            except Exception as e:
+                print(f"❌ Error cleaning up job {self.id}: {e}")
+
+    def _begin(self, status):
+        """Moves a queued job into a stage, unless it was cancelled meanwhile."""
+        with self._cond:
+            if self._cancelled.is_set():
+                raise JobCancelled()
+            self.status = status
+            self.progress = 0.0
+            self.version += 1
+            self._cond.notify_all()
+
+    def check_cancelled(self):
+        """Stage functions call this between steps; raises JobCancelled once the job is cancelled."""
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Cancels the job: a queued job never starts, a running one stops at its next check."""
+        with self._cond:
+            self._cancelled.set()
+            waiting = self.status == QUEUED
+            if waiting:
+                self.status = CANCELLED
+                self.finished = time.time()
+            self.version += 1
+            self._cond.notify_all()
+        if waiting and self._cleanups:
+            # Closing may wait for work still in flight (a page being OCR'd); don't hold up the caller
+            threading.Thread(target=self._clean_up, name="job-cleanup", daemon=True).start()
+
+    def wait(self, version, timeout=None):
+        """Blocks until the job changes after `version` (or the timeout passes); returns the new version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version or self.status in FINISHED, timeout)
+            return self.version
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": self.progress,
+                "notes": list(self.notes),
+                "error": self.error,
+                "submitted": self.submitted,
+                "started": self.started,
+                "finished": self.finished,
+                "version": self.version,
+            }
+
+
+class JobManager:
+    """Priority queues and worker threads for the OCR and TTS stages of conversions."""
+
+    def __init__(self, ocr_workers=OCR_JOB_WORKERS, tts_workers=TTS_JOB_WORKERS,
+                 max_queued=JOB_QUEUE_LIMIT, retention=JOB_RETENTION):
+        self.max_queued = max_queued
+        self.retention = retention
+        self.workers = {OCR: max(1, ocr_workers), TTS: max(1, tts_workers)}
+        self._queues = {OCR: [], TTS: []}
+        self._running = {OCR: 0, TTS: 0}
+        self._jobs = {}
+        self._order = itertools.count()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._threads = [threading.Thread(target=self._work, args=(stage,), name=f"job-{stage}", daemon=True)
+                         for stage, count in self.workers.items() for _ in range(count)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, session_id, ocr, tts, priority=PRIORITY_INTERACTIVE, result=None):
+        """Queues a conversion and returns its job id.
+
+        `ocr(job)` returns the recognized text and `tts(job, text)` produces the
+        audio; both run in a copy of the caller's context. `result` seeds
+        job.result (e.g. the settings the UI needs to show the output). A session
+        has at most one conversion in flight: submitting again cancels the previous one.
+        """
+        job = Job(session_id, priority, ocr, tts, contextvars.copy_context())
+        job.result.update(result or {})
+        with self._cond:
+            if self._closed:
+                raise Exception("Job manager is closed")
+            for other in self._jobs.values():
+                if other.session_id == session_id and other.status not in FINISHED:
+                    other.cancel()
+            if self._waiting() >= self.max_queued:
+                raise Exception("Too many conversions are waiting, please try again in a moment")
+            self._jobs[job.id] = job
+            heapq.heappush(self._queues[OCR], (priority, next(self._order), job))
+            self._cond.notify_all()
+        return job.id
+
+    def _waiting(self):
+        return sum(1 for queue in self._queues.values() for _, _, job in queue if not job.cancelled)
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """A job's snapshot plus `position`, the number of jobs ahead of it in its stage's queue."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        status = job.snapshot()
+        with self._cond:
+            entry = next((item for item in self._queues[job.stage] if item[2] is job), None)
+            status["position"] = (sum(1 for item in self._queues[job.stage]
+                                      if item < entry and not item[2].cancelled) if entry else 0)
+        return status
+
+    def _work(self, stage):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._queues[stage])
+                if self._closed:
+                    return
+                priority, order, job = heapq.heappop(self._queues[stage])
+                if job.cancelled:
+                    continue
+                self._running[stage] += 1
+            try:
+                self._run_stage(stage, job, priority, order)
+            finally:
+                with self._cond:
+                    self._running[stage] -= 1
+
+    def _run_stage(self, stage, job, priority, order):
+        try:
+            job._begin(stage)
+            if stage == OCR:
+                job._update(started=time.time())
+                text = job._context.run(job._ocr, job)
+                job.result["text"] = text
+                job.check_cancelled()
+                if not text:
+                    job._update(status=DONE, progress=1.0, finished=time.time())
+                    return
+                # Keeps its place: the original submission order breaks ties in the TTS queue too
+                job._update(status=QUEUED, stage=TTS, progress=0.0)
+                with self._cond:
+                    heapq.heappush(self._queues[TTS], (priority, order, job))
+                    self._cond.notify_all()
+            else:
+                job._context.run(job._tts, job, job.result["text"])
+                job._update(status=DONE, progress=1.0, finished=time.time())
+        except JobCancelled:
+            job._update(status=CANCELLED, finished=time.time())
+        except Exception as e:
+            job._update(status=FAILED, error=str(e), finished=time.time())
+        finally:
+            if job.status in FINISHED:
+                job._clean_up()
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED:
+            job.cancel()
+
+    def reap(self, is_active):
+        """Cancels the jobs of sessions where is_active(session_id) is False and drops old finished jobs."""
+        now = time.time()
+        with self._cond:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if is_active(job.session_id):
+                forget = job.status in FINISHED and now - job.finished > self.retention
+            else:
+                job.cancel()
+                # A running stage stops at its next check; the job is dropped on a later pass
+                forget = job.status in FINISHED
+            if forget:
+                with self._cond:
+                    self._jobs.pop(job.id, None)
+
+    def stats(self):
+        with self._cond:
+            return {stage: {"waiting": sum(1 for _, _, job in self._queues[stage] if not job.cancelled),
+                            "running": self._running[stage], "workers": self.workers[stage]}
+                    for stage in (OCR, TTS)}
+
+    def close(self):
+        """Cancels every job and stops the workers (running stages finish their current step first)."""
+        with self._cond:
+            self._closed = True
+            jobs = list(self._jobs.values())
+            self._cond.notify_all()
+        for job in jobs:
+            if job.status not in FINISHED:
+                job.cancel()
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,193 @@
+"""Continuous OCR of a video stream: each new page is recognized once, in the background.
+
+A PageDetector compares every frame with the page it last read through a
+tiny grayscale thumbnail, normalized for brightness and contrast so exposure
+changes don't count. While the page on camera is the one already read, a
+frame costs one resize and a dot product. When the similarity drops below
+PAGE_SIMILARITY (a page being turned, a hand in the way), the detector waits
+for the picture to hold still for LIVE_STABLE_FRAMES frames. If it settled on
+a different page, the sharpest frame of that still stretch (kept by a
+frame_select.FrameSelector) goes to an OCRWorker thread; if it is the same
+page again, nothing is read. Recognized text is passed on (e.g. queued for reading
+aloud) while the capture loop keeps running.
+
+Works on a camera index or a video file, so it can be checked without a camera:
+    python live_ocr.py notebook.mp4
+"""
+import os
+import queue
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+from frame_select import FrameSelector
+
+# Width of the thumbnail compared between frames
+LIVE_THUMB_WIDTH = int(os.environ.get("LIVE_THUMB_WIDTH", "64"))
+# Thumbnail correlation (0-1) below which the picture no longer counts as the page already read.
+# The same page under camera noise scores ~0.97; pages with the same layout but different text ~0.88
+PAGE_SIMILARITY = float(os.environ.get("PAGE_SIMILARITY", "0.93"))
+# Sharpness needed before a settled page is sent to OCR (lower than auto-capture: live video is softer)
+LIVE_MIN_SHARPNESS = float(os.environ.get("LIVE_MIN_SHARPNESS", "60"))
+# Consecutive frames at least this similar count as holding still (~3 px of movement at 720p)
+LIVE_STEADY_SIMILARITY = float(os.environ.get("LIVE_STEADY_SIMILARITY", "0.99"))
+# Frames the new page must hold still before it is read
+LIVE_STABLE_FRAMES = int(os.environ.get("LIVE_STABLE_FRAMES", "6"))
+# Pages allowed to wait for OCR; when full the capture loop waits instead of dropping pages
+LIVE_OCR_QUEUE = int(os.environ.get("LIVE_OCR_QUEUE", "4"))
+
+
+def page_signature(frame, width=LIVE_THUMB_WIDTH):
+    """Small grayscale thumbnail of a frame, zero-mean and unit-norm so brightness changes cancel out."""
+    height, full_width = frame.shape[:2]
+    thumb = cv2.resize(frame, (width, max(1, height * width // full_width)), interpolation=cv2.INTER_AREA)
+    if thumb.ndim == 3:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+    signature = thumb.astype(np.float32).ravel()
+    signature -= signature.mean()
+    norm = np.linalg.norm(signature)
+    return signature / norm if norm else signature
+
+
+def similarity(a, b):
+    """Correlation of two page signatures: 1.0 for the same picture, near 0 for unrelated ones."""
+    return float(np.dot(a, b))
+
+
+class PageDetector:
+    """Decides, frame by frame, when a new page has settled in front of the camera."""
+
+    def __init__(self, min_similarity=PAGE_SIMILARITY, min_sharpness=LIVE_MIN_SHARPNESS,
+                 stable_frames=LIVE_STABLE_FRAMES, steady_similarity=LIVE_STEADY_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.min_sharpness = min_sharpness
+        self.stable_frames = stable_frames
+        self.steady_similarity = steady_similarity
+        # Frames of the current still stretch, to pick the sharpest from
+        self.selector = FrameSelector()
+        self.page = None
+        self.steady = 0
+        self.frames = 0
+        self.skipped = 0
+        self.pages = 0
+        self._previous = None
+
+    def add(self, frame):
+        """Returns the sharpest frame of a newly settled page, or None."""
+        self.frames += 1
+        signature = page_signature(frame)
+        if self.page is not None and similarity(signature, self.page) >= self.min_similarity:
+            # Still the page that was already read: nothing else to do for this frame
+            self.skipped += 1
+            if self._previous is not None:
+                self._restart()
+            return None
+
+        if self._previous is not None and similarity(signature, self._previous) >= self.steady_similarity:
+            self.steady += 1
+        else:
+            # Moving: only frames from after the picture stops count
+            self._restart()
+        self._previous = signature
+        self.selector.add(frame)
+        if self.steady < self.stable_frames:
+            return None
+
+        best, score = self.selector.best()
+        if score < self.min_sharpness:
+            return None
+        self._restart()
+        signature = page_signature(best)
+        if self.page is not None and similarity(signature, self.page) >= self.min_similarity:
+            # Settled back on the same page (e.g. a hand passed over it)
+            return None
+        self.page = signature
+        self.pages += 1
+        return best
+
+    def _restart(self):
+        self.selector.reset()
+        self.steady = 0
+        self._previous = None
+
+
+class OCRWorker:
+    """Background thread running `extract(frame)` on detected pages, in order.
+
+    `on_text(page_number, text)` is called on the worker thread for every page
+    with text; close() waits for the queued pages to finish.
+    """
+
+    def __init__(self, extract, on_text, max_queued=LIVE_OCR_QUEUE):
+        self.extract = extract
+        self.on_text = on_text
+        self.errors = []
+        self._pages = queue.Queue(maxsize=max(1, max_queued))
+        self._thread = threading.Thread(target=self._run, name="live-ocr", daemon=True)
+        self._thread.start()
+
+    def submit(self, page_number, frame):
+        self._pages.put((page_number, frame))
+
+    def _run(self):
+        while True:
+            item = self._pages.get()
+            if item is None:
+                return
+            page_number, frame = item
+            try:
+                text = self.extract(frame)
+            except Exception as e:
+                self.errors.append(f"page {page_number}: {e}")
+                print(f"❌ OCR failed on page {page_number}: {e}")
+                continue
+            if text:
+                self.on_text(page_number, text)
+
+    def close(self):
+        self._pages.put(None)
+        self._thread.join()
+
+
+def run_live(source, extract, on_text, show=True, stop=None):
+    """Reads frames from a camera index or video file until it ends, Esc is pressed or `stop` is set.
+
+    Returns the PageDetector, whose counters say how many frames were skipped and pages read.
+    """
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise Exception(f"Could not open video source {source!r}")
+    detector = PageDetector()
+    worker = OCRWorker(extract, on_text)
+    try:
+        while stop is None or not stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            page = detector.add(frame)
+            if page is not None:
+                print(f"📄 New page {detector.pages} detected")
+                worker.submit(detector.pages, page)
+            if show:
+                cv2.imshow("Live Notes (Esc to stop)", frame)
+                if cv2.waitKey(1) == 27:
+                    break
+    finally:
+        cap.release()
+        if show:
+            cv2.destroyAllWindows()
+        worker.close()
+    return detector
+
+
+if __name__ == "__main__":
+    from app import extract_text_from_image
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    detector = run_live(source, extract_text_from_image,
+                        lambda page, text: print(f"📝 Page {page}:\n{text}"), show=isinstance(source, int))
+    print(f"✅ {detector.pages} page(s) read, {detector.skipped} of {detector.frames} frames skipped as unchanged")
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Default on-disk location for the OCR cache (set OCR_CACHE_DIR="" to disable)
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", "ocr_cache")
+OCR_CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", "256"))
+
+
+def image_key(pixels, config, preprocessing, lang):
+    """Builds a content hash from decoded pixels plus every OCR setting that affects the result.
+
+    `preprocessing` identifies the preprocessing applied before OCR (pipeline signature).
+    """
+    pixels = np.ascontiguousarray(pixels)
+    digest = hashlib.sha256()
+    digest.update(str(pixels.shape).encode())
+    digest.update(str(pixels.dtype).encode())
+    digest.update(pixels.tobytes())
+    digest.update(f"|{config}|{preprocessing}|{lang}".encode())
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """In-memory LRU cache of OCR results with an optional on-disk tier."""
+
+    def __init__(self, max_entries=OCR_CACHE_SIZE, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _remember(self, key, text):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Returns the cached text for key, or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except OSError:
+                text = None
+            if text is not None:
+                with self._lock:
+                    self._remember(key, text)
+                    self.hits += 1
+                return text
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, text):
+        """Stores text in memory and, if enabled, writes it atomically to disk."""
+        with self._lock:
+            self._remember(key, text)
+
+        if self.cache_dir:
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError:
+                # The disk tier is best effort; the in-memory entry is still valid
+                pass
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached text for key, calling compute() and storing its result on a miss."""
+        text = self.get(key)
+        if text is None:
+            text = compute()
+            self.put(key, text)
+        return text
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Returns the process-wide OCR cache shared by the CLI and Streamlit apps."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = OCRCache(cache_dir=OCR_CACHE_DIR or None)
+        return _default_cache
@@ -0,0 +1,172 @@
+import os
+import queue
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+DEFAULT_OCR_CONFIG = r'--oem 3 --psm 6'
+DEFAULT_OCR_LANG = 'eng'
+# Which engine to prefer: "auto" (tesserocr when installed, else pytesseract), "tesserocr" or "pytesseract"
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "auto")
+OCR_POOL_SIZE = int(os.environ.get("OCR_POOL_SIZE", str(os.cpu_count() or 1)))
+
+
+def parse_config(config):
+    """Splits a pytesseract-style config string into (oem, psm, {variable: value})."""
+    oem = re.search(r'--oem\s+(\d+)', config)
+    psm = re.search(r'--psm\s+(\d+)', config)
+    variables = dict(re.findall(r'-c\s+(\w+)=(\S+)', config))
+    return (
+        int(oem.group(1)) if oem else 3,
+        int(psm.group(1)) if psm else 3,
+        variables,
+    )
+
+
+class OCREngine:
+    """Interface for OCR backends: recognize() turns a grayscale/RGB numpy image into text."""
+
+    name = "base"
+
+    def __init__(self, lang=DEFAULT_OCR_LANG, config=DEFAULT_OCR_CONFIG):
+        self.lang = lang
+        self.config = config
+
+    def recognize(self, image):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractEngine(OCREngine):
+    """Runs the tesseract binary through pytesseract (one subprocess per call)."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang=DEFAULT_OCR_LANG, config=DEFAULT_OCR_CONFIG):
+        super().__init__(lang, config)
+        import pytesseract
+        self._pytesseract = pytesseract
+
+    def recognize(self, image):
+        return self._pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+
+
+class TesserocrEngine(OCREngine):
+    """Keeps a warm libtesseract instance (via tesserocr) so models load only once."""
+
+    name = "tesserocr"
+
+    def __init__(self, lang=DEFAULT_OCR_LANG, config=DEFAULT_OCR_CONFIG):
+        super().__init__(lang, config)
+        import tesserocr
+        oem, psm, variables = parse_config(config)
+        self._api = tesserocr.PyTessBaseAPI(lang=lang, oem=oem, psm=psm)
+        for name, value in variables.items():
+            self._api.SetVariable(name, value)
+
+    def recognize(self, image):
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        # Hand the raw buffer to libtesseract directly; no PNG encode or temp file
+        self._api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        text = self._api.GetUTF8Text()
+        self._api.Clear()
+        return text
+
+    def close(self):
+        self._api.End()
+
+
+ENGINES = {
+    PytesseractEngine.name: PytesseractEngine,
+    TesserocrEngine.name: TesserocrEngine,
+}
+
+
+def register_engine(engine_class):
+    """Registers an additional OCREngine subclass under its name."""
+    ENGINES[engine_class.name] = engine_class
+    return engine_class
+
+
+def create_engine(name=OCR_ENGINE, lang=DEFAULT_OCR_LANG, config=DEFAULT_OCR_CONFIG):
+    """Creates an engine by name; "auto" prefers tesserocr and falls back to pytesseract."""
+    if name == "auto":
+        try:
+            return TesserocrEngine(lang, config)
+        except Exception:
+            return PytesseractEngine(lang, config)
+    if name not in ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    return ENGINES[name](lang, config)
+
+
+class EnginePool:
+    """Thread-safe pool of long-lived engines; each call borrows one engine exclusively."""
+
+    def __init__(self, size=OCR_POOL_SIZE, name=OCR_ENGINE, lang=DEFAULT_OCR_LANG, config=DEFAULT_OCR_CONFIG):
+        self.size = max(1, size)
+        self.name = name
+        self.lang = lang
+        self.config = config
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        try:
+            engine = self._idle.get_nowait()
+        except queue.Empty:
+            engine = None
+            with self._lock:
+                # Engines are created lazily, up to the pool size
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    engine = create_engine(self.name, self.lang, self.config)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                engine = self._idle.get()
+        try:
+            yield engine
+        finally:
+            self._idle.put(engine)
+
+    def recognize(self, image):
+        with self.acquire() as engine:
+            return engine.recognize(image)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_engine_pool(lang=DEFAULT_OCR_LANG, config=DEFAULT_OCR_CONFIG):
+    """Returns the process-wide engine pool for the given language and config."""
+    key = (lang, config)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = EnginePool(lang=lang, config=config)
+        return _pools[key]
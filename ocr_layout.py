@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from profiling import timed
+
+# Images shorter than this are OCR'd in a single call; tiling only pays off on large scans
+TILE_MIN_HEIGHT = int(os.environ.get("OCR_TILE_MIN_HEIGHT", "1000"))
+# Keep at least this many text lines per region so Tesseract still sees a uniform block
+TILE_MIN_LINES = 3
+
+
+def ink_mask(binary):
+    """Marks text pixels, treating whichever colour is in the minority as ink (handles dark mode)."""
+    dark = binary < 128
+    return dark if np.count_nonzero(dark) * 2 < dark.size else ~dark
+
+
+def detect_line_bands(binary, min_ink_ratio=0.005, max_gap=2, min_height=4):
+    """Finds horizontal text bands in a binarized image using the row-wise ink projection profile.
+
+    Constant per-row ink such as page borders or margin rules is subtracted as a baseline.
+    Returns a list of (top, bottom) row ranges.
+    """
+    ink_per_row = np.count_nonzero(ink_mask(binary), axis=1)
+    baseline = np.percentile(ink_per_row, 5)
+    has_ink = ink_per_row > baseline + max(2, min_ink_ratio * binary.shape[1])
+
+    bands = []
+    start = None
+    gap = 0
+    for row, inked in enumerate(has_ink):
+        if inked:
+            if start is None:
+                start = row
+            gap = 0
+        elif start is not None:
+            gap += 1
+            # Tolerate a few blank rows inside a line (dots, descenders)
+            if gap > max_gap:
+                bands.append((start, row - gap + 1))
+                start = None
+                gap = 0
+    if start is not None:
+        bands.append((start, len(has_ink) - gap))
+    # Drop bands too thin to be text (ruled lines, specks)
+    return [(top, bottom) for top, bottom in bands if bottom - top >= min_height]
+
+
+def group_bands(bands, groups):
+    """Splits consecutive line bands into at most `groups` runs of roughly equal height."""
+    if not bands:
+        return []
+    groups = max(1, min(groups, len(bands) // TILE_MIN_LINES))
+    total = sum(bottom - top for top, bottom in bands)
+    target = total / groups
+
+    regions = []
+    current = []
+    height = 0
+    for band in bands:
+        current.append(band)
+        height += band[1] - band[0]
+        if height >= target and len(regions) < groups - 1 and len(current) >= TILE_MIN_LINES:
+            regions.append((current[0][0], current[-1][1]))
+            current = []
+            height = 0
+    if current:
+        regions.append((current[0][0], current[-1][1]))
+    return regions
+
+
+def split_regions(binary, workers):
+    """Cuts the image into horizontal regions, in reading order, covering every row.
+
+    Cuts fall midway through the blank gap between text lines, so no glyph is split or duplicated.
+    """
+    groups = group_bands(detect_line_bands(binary), workers)
+    if len(groups) < 2:
+        return [(0, binary.shape[0])]
+
+    cuts = [0]
+    for (_, previous_bottom), (next_top, _) in zip(groups, groups[1:]):
+        cuts.append((previous_bottom + next_top) // 2)
+    cuts.append(binary.shape[0])
+    return list(zip(cuts, cuts[1:]))
+
+
+@timed("ocr.recognize")
+def recognize_tiled(binary, pool, workers=None):
+    """OCRs a binarized image, splitting large pages into line-aligned regions run in parallel.
+
+    Small images, or pages where no split is possible, fall back to a single engine call.
+    """
+    workers = workers or pool.size
+    if workers < 2 or binary.shape[0] < TILE_MIN_HEIGHT:
+        return pool.recognize(binary)
+
+    regions = split_regions(binary, workers)
+    if len(regions) < 2:
+        return pool.recognize(binary)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(regions))) as executor:
+        # Views, not copies: each worker reads its own row range of the shared buffer
+        texts = executor.map(lambda r: pool.recognize(binary[r[0]:r[1]]).strip(), regions)
+        return "\n".join(text for text in texts if text)
@@ -0,0 +1,187 @@
+"""Per-session sentence playback with voice/button commands.
+
+A PlaybackController owns one session's sentences, cursor and play/pause state
+behind a lock. Commands may arrive from any thread (the voice listener, a
+button); the playback thread sleeps on a condition variable while paused or
+finished instead of polling, and an in-progress sentence is interrupted as soon
+as a command changes what should be playing.
+"""
+import threading
+
+from voice_control import INTERRUPTING_COMMANDS
+
+
+class PlaybackController:
+    """Thread-safe playback state and worker threads for one session.
+
+    `speaker.play(clip, interrupted)` plays one clip and returns False if the
+    `interrupted` event was set before it finished (see audio_assembly.Speaker).
+    close() stops the listener and the playback thread and joins them.
+    """
+
+    def __init__(self):
+        self.sentences = []
+        self.position = 0
+        self.playing = False
+        self.last_command = None
+        # Bumped whenever a command moves the cursor, so a finishing clip does not advance it again
+        self._generation = 0
+        # Identifies the current playback thread; older threads exit when it changes
+        self._run_id = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        # Set to cut the clip being played short; a fresh one is made for every clip
+        self._interrupted = threading.Event()
+        self._listener = None
+        self._thread = None
+
+    def start(self, sentences, clip_for, speaker, cleanup=None):
+        """Starts reading `sentences` from the top; `clip_for(index)` returns a sentence's audio.
+
+        `cleanup` is called on the playback thread when it exits (stop, close or restart).
+        """
+        self.stop()
+        with self._cond:
+            if self._closed:
+                raise Exception("Playback controller is closed")
+            self.sentences = list(sentences)
+            self.position = 0
+            self.playing = bool(self.sentences)
+            self._generation += 1
+            self._run_id += 1
+            self._thread = threading.Thread(target=self._run, args=(clip_for, speaker, self._run_id, cleanup),
+                                            name="playback", daemon=True)
+            self._thread.start()
+
+    def _run(self, clip_for, speaker, run_id, cleanup):
+        try:
+            self._play_sentences(clip_for, speaker, run_id)
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+    def _play_sentences(self, clip_for, speaker, run_id):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stale(run_id) or
+                                    (self.playing and self.position < len(self.sentences)))
+                if self._stale(run_id):
+                    return
+                index = self.position
+                started = self._generation
+                interrupted = self._interrupted = threading.Event()
+
+            completed = speaker.play(clip_for(index), interrupted)
+
+            with self._cond:
+                # A command that moved the cursor meanwhile has already decided what comes next
+                if completed and self._generation == started:
+                    self.position += 1
+                    if self.position >= len(self.sentences):
+                        self.playing = False
+                    self._cond.notify_all()
+
+    def _stale(self, run_id):
+        return self._closed or self._run_id != run_id
+
+    def command(self, command):
+        """Applies pause/resume/repeat/skip; safe to call from any thread."""
+        with self._cond:
+            self.last_command = command
+            if not self.sentences and command in ("resume", "repeat", "skip"):
+                # Nothing to play (e.g. a note without text): leave the cursor at 0
+                return
+            if command == "pause":
+                self.playing = False
+            elif command == "resume":
+                self.playing = self.position < len(self.sentences)
+            elif command == "repeat":
+                # After the end, repeat replays the last sentence
+                self.position = max(0, min(self.position, len(self.sentences) - 1))
+                self.playing = True
+            elif command == "skip":
+                self.position = min(self.position + 1, len(self.sentences))
+                self.playing = self.position < len(self.sentences)
+            else:
+                return
+            if command in INTERRUPTING_COMMANDS:
+                self._generation += 1
+                self._interrupted.set()
+            self._cond.notify_all()
+
+    def attach_listener(self, listener):
+        """Routes a CommandListener's commands here; the listener is stopped on close()."""
+        if self._listener is not None:
+            self._listener.stop()
+        listener.on_command = self.command
+        self._listener = listener.start()
+
+    def wait_until_finished(self, timeout=None):
+        """Blocks until the last sentence has been played (or the controller is closed)."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._closed or (self.position >= len(self.sentences) and not self.playing), timeout)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "position": self.position,
+                "total": len(self.sentences),
+                "playing": self.playing,
+                "last_command": self.last_command,
+            }
+
+    def stop(self):
+        """Stops the current playback thread (the listener keeps running)."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self.playing = False
+            self._generation += 1
+            self._run_id += 1
+            self._interrupted.set()
+            self._cond.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def close(self):
+        """Ends the session: stops the listener and playback threads and waits for them."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        with self._cond:
+            self._closed = True
+        self.stop()
+
+
+class SessionRegistry:
+    """One PlaybackController per session id; controllers of ended sessions are closed."""
+
+    def __init__(self):
+        self._controllers = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            if session_id not in self._controllers:
+                self._controllers[session_id] = PlaybackController()
+            return self._controllers[session_id]
+
+    def reap(self, is_active):
+        """Closes and forgets controllers whose session is_active(session_id) is False."""
+        with self._lock:
+            ended = [sid for sid in self._controllers if not is_active(sid)]
+            controllers = [self._controllers.pop(sid) for sid in ended]
+        for controller in controllers:
+            controller.close()
+        return len(controllers)
+
+    def close_all(self):
+        with self._lock:
+            controllers = list(self._controllers.values())
+            self._controllers.clear()
+        for controller in controllers:
+            controller.close()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._controllers)
@@ -0,0 +1,376 @@
+"""Configurable image preprocessing pipeline for OCR.
+
+A pipeline is an ordered list of stages built from a spec string, e.g.
+    "grayscale,downscale,denoise,threshold:otsu,deskew,crop"
+Each stage writes into a preallocated per-thread buffer that is reused across
+calls, so the array returned by run() is only valid until the next run() on the
+same thread; copy it if it has to be kept.
+"""
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import profiling
+from ocr_layout import ink_mask
+
+DEFAULT_PIPELINE = os.environ.get("PREPROCESS_PIPELINE", "grayscale,xheight,threshold:otsu")
+# Tesseract works best at roughly 300 DPI; anything above that only costs time
+TARGET_DPI = 300
+# Upper bound for images without DPI metadata (camera frames): longest side in pixels
+MAX_SIDE = 2500
+# Tesseract's sweet spot for lowercase letter height; text already within the band is left alone
+TARGET_XHEIGHT = 30
+XHEIGHT_BAND = (20, 40)
+
+
+class Stage:
+    """A single preprocessing step; subclasses implement apply()."""
+
+    name = "stage"
+
+    def signature(self):
+        return self.name
+
+    def apply(self, image, ctx):
+        raise NotImplementedError
+
+
+class Grayscale(Stage):
+    name = "grayscale"
+
+    def __init__(self, order="rgb"):
+        self.order = order
+
+    def apply(self, image, ctx):
+        if image.ndim == 2:
+            return image
+        channels = image.shape[2]
+        if self.order == "bgr":
+            code = cv2.COLOR_BGRA2GRAY if channels == 4 else cv2.COLOR_BGR2GRAY
+        else:
+            code = cv2.COLOR_RGBA2GRAY if channels == 4 else cv2.COLOR_RGB2GRAY
+        return cv2.cvtColor(image, code, dst=ctx.buffer(self, image.shape[:2], np.uint8))
+
+
+class Downscale(Stage):
+    """Shrinks oversized images to TARGET_DPI (or MAX_SIDE when the DPI is unknown)."""
+
+    name = "downscale"
+
+    def __init__(self, target_dpi=TARGET_DPI, max_side=MAX_SIDE):
+        self.target_dpi = target_dpi
+        self.max_side = max_side
+
+    def signature(self):
+        return f"{self.name}:{self.target_dpi}:{self.max_side}"
+
+    def apply(self, image, ctx):
+        height, width = image.shape[:2]
+        scale = self.max_side / max(height, width)
+        if ctx.dpi:
+            scale = min(scale, self.target_dpi / ctx.dpi)
+        if scale >= 1:
+            return image
+
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        ctx.scale *= scale
+        dst = ctx.buffer(self, (size[1], size[0]) + image.shape[2:], image.dtype)
+        return cv2.resize(image, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+
+def estimate_xheight(gray, probe_side=1500):
+    """Estimates the typical character height in pixels from connected components, or None.
+
+    Works on a downscaled, Otsu-binarized probe copy so the estimate is cheap on large photos.
+    """
+    height, width = gray.shape[:2]
+    factor = min(1.0, probe_side / max(height, width))
+    probe = gray
+    if factor < 1:
+        probe = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(probe, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink_mask(binary).view(np.uint8), connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    # Ignore specks, ruled lines, page borders and picture-sized blobs
+    keep = (heights >= 3) & (areas >= 6) & (widths <= heights * 15) & (heights <= probe.shape[0] * 0.1)
+    if np.count_nonzero(keep) < 10:
+        return None
+    # Noisy photos binarize into many tiny fragments; measure only the larger half of the glyphs
+    keep &= areas >= np.median(areas[keep])
+    return float(np.median(heights[keep])) / factor
+
+
+class XHeightScale(Downscale):
+    """Rescales the image so text has roughly TARGET_XHEIGHT pixel letters, within max_side.
+
+    Falls back to the plain Downscale limits when no text height can be measured.
+    """
+
+    name = "xheight"
+
+    def __init__(self, target=TARGET_XHEIGHT, max_side=MAX_SIDE):
+        super().__init__(max_side=max_side)
+        self.target = target
+
+    def signature(self):
+        return f"{self.name}:{self.target}:{self.max_side}"
+
+    def apply(self, image, ctx):
+        xheight = estimate_xheight(image)
+        ctx.xheight = xheight
+        if xheight is None:
+            return super().apply(image, ctx)
+
+        height, width = image.shape[:2]
+        # The max_side budget applies even when the text is already in the band
+        scale = min(1.0, self.max_side / max(height, width))
+        if not XHEIGHT_BAND[0] <= xheight <= XHEIGHT_BAND[1]:
+            # Never upscale more than 2x or past max_side
+            scale = min(self.target / xheight, 2.0, self.max_side / max(height, width))
+        if scale == 1:
+            return image
+
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        ctx.scale *= scale
+        dst = ctx.buffer(self, (size[1], size[0]) + image.shape[2:], image.dtype)
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        return cv2.resize(image, size, dst=dst, interpolation=interpolation)
+
+
+class Denoise(Stage):
+    name = "denoise"
+
+    def __init__(self, ksize=3):
+        self.ksize = ksize
+
+    def signature(self):
+        return f"{self.name}:{self.ksize}"
+
+    def apply(self, image, ctx):
+        return cv2.medianBlur(image, self.ksize, dst=ctx.buffer(self, image.shape, image.dtype))
+
+
+class Threshold(Stage):
+    """Binarizes a grayscale image with a fixed, Otsu or Sauvola threshold."""
+
+    name = "threshold"
+
+    def __init__(self, method="otsu", value=150, window=25, k=0.2):
+        self.method = method
+        self.value = value
+        self.window = window
+        self.k = k
+
+    def signature(self):
+        if self.method == "fixed":
+            return f"{self.name}:fixed:{self.value}"
+        if self.method == "sauvola":
+            return f"{self.name}:sauvola:{self.window}:{self.k}"
+        return f"{self.name}:{self.method}"
+
+    def apply(self, image, ctx):
+        dst = ctx.buffer(self, image.shape, np.uint8)
+        if self.method == "fixed":
+            cv2.threshold(image, self.value, 255, cv2.THRESH_BINARY, dst=dst)
+        elif self.method == "otsu":
+            cv2.threshold(image, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=dst)
+        elif self.method == "sauvola":
+            self._sauvola(image, dst, ctx)
+        else:
+            raise ValueError(f"Unknown threshold method: {self.method}")
+        return dst
+
+    def _sauvola(self, image, dst, ctx):
+        # T = mean * (1 + k * (std / R - 1)), with local mean/std from box filters
+        window = (self.window, self.window)
+        gray = ctx.buffer(self, image.shape, np.float32, "gray")
+        mean = ctx.buffer(self, image.shape, np.float32, "mean")
+        sq_mean = ctx.buffer(self, image.shape, np.float32, "sq_mean")
+        np.copyto(gray, image, casting="unsafe")
+        if cv2.mean(image)[0] < 128:
+            # Dark mode: the formula expects dark text on a light page, so flip it first
+            np.subtract(255, gray, out=gray)
+        cv2.boxFilter(gray, cv2.CV_32F, window, dst=mean, borderType=cv2.BORDER_REPLICATE)
+        cv2.sqrBoxFilter(gray, cv2.CV_32F, window, dst=sq_mean, borderType=cv2.BORDER_REPLICATE)
+        # sq_mean becomes the local standard deviation, then the threshold
+        np.subtract(sq_mean, mean * mean, out=sq_mean)
+        np.maximum(sq_mean, 0, out=sq_mean)
+        np.sqrt(sq_mean, out=sq_mean)
+        np.multiply(sq_mean, self.k / 128.0, out=sq_mean)
+        np.add(sq_mean, 1 - self.k, out=sq_mean)
+        np.multiply(sq_mean, mean, out=sq_mean)
+        np.greater(gray, sq_mean, out=dst, casting="unsafe")
+        np.multiply(dst, 255, out=dst)
+
+
+class Deskew(Stage):
+    """Rotates the page so text lines are horizontal (minimum-area rectangle around the ink)."""
+
+    name = "deskew"
+
+    def __init__(self, max_angle=15.0, min_angle=0.3):
+        self.max_angle = max_angle
+        self.min_angle = min_angle
+
+    def apply(self, image, ctx):
+        points = cv2.findNonZero(ink_mask(image).view(np.uint8))
+        if points is None:
+            return image
+        angle = cv2.minAreaRect(points)[2]
+        if angle > 45:
+            angle -= 90
+        elif angle < -45:
+            angle += 90
+        if abs(angle) < self.min_angle or abs(angle) > self.max_angle:
+            return image
+
+        height, width = image.shape[:2]
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        background = 255 if np.count_nonzero(image > 127) * 2 > image.size else 0
+        ctx.angle = angle
+        return cv2.warpAffine(image, matrix, (width, height), dst=ctx.buffer(self, image.shape, image.dtype),
+                              flags=cv2.INTER_NEAREST, borderMode=cv2.BORDER_CONSTANT, borderValue=background)
+
+
+class CropBorder(Stage):
+    """Trims empty margins around the ink (returns a view, no copy)."""
+
+    name = "crop"
+
+    def __init__(self, margin=10):
+        self.margin = margin
+
+    def signature(self):
+        return f"{self.name}:{self.margin}"
+
+    def apply(self, image, ctx):
+        points = cv2.findNonZero(ink_mask(image).view(np.uint8))
+        if points is None:
+            return image
+        x, y, w, h = cv2.boundingRect(points)
+        height, width = image.shape[:2]
+        return image[max(0, y - self.margin):min(height, y + h + self.margin),
+                     max(0, x - self.margin):min(width, x + w + self.margin)]
+
+
+STAGES = {
+    Grayscale.name: Grayscale,
+    Downscale.name: Downscale,
+    XHeightScale.name: XHeightScale,
+    Denoise.name: Denoise,
+    Threshold.name: Threshold,
+    Deskew.name: Deskew,
+    CropBorder.name: CropBorder,
+}
+
+
+class _Context:
+    """Per-run state handed to each stage: reusable buffers, source DPI and accumulated scale."""
+
+    def __init__(self, buffers, dpi):
+        self._buffers = buffers
+        self.dpi = dpi
+        self.scale = 1.0
+        self.xheight = None
+        self.angle = 0.0
+
+    def buffer(self, stage, shape, dtype, tag=""):
+        key = (id(stage), tag)
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buf
+        return buf
+
+
+class PreprocessPipeline:
+    """Runs stages in order, timing each one."""
+
+    def __init__(self, stages):
+        self.stages = stages
+        self._local = threading.local()
+
+    def signature(self):
+        """Identifies the pipeline configuration (used in OCR cache keys)."""
+        return ",".join(stage.signature() for stage in self.stages)
+
+    def run(self, image, timings=None, dpi=None):
+        """Returns the processed image; per-stage seconds are added to `timings` if given."""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        ctx = _Context(buffers, dpi)
+        record = profiling.current()
+        for stage in self.stages:
+            start = time.perf_counter()
+            image = stage.apply(image, ctx)
+            if timings is not None or record is not None:
+                elapsed = time.perf_counter() - start
+                if timings is not None:
+                    timings[stage.name] = timings.get(stage.name, 0.0) + elapsed
+                if record is not None:
+                    record.add(f"preprocess.{stage.name}", elapsed, start)
+        self._local.last_report = {"scale": ctx.scale, "xheight": ctx.xheight, "angle": ctx.angle}
+        return image
+
+    @property
+    def last_report(self):
+        """Scale factor, measured x-height and deskew angle from the last run() on this thread."""
+        return getattr(self._local, "last_report", {"scale": 1.0, "xheight": None, "angle": 0.0})
+
+    @property
+    def last_scale(self):
+        """Total resize factor applied by the last run() on this thread."""
+        return self.last_report["scale"]
+
+
+def build_pipeline(spec=DEFAULT_PIPELINE, order="rgb"):
+    """Builds a pipeline from a spec like "grayscale,downscale,threshold:sauvola,deskew".
+
+    Stage options follow a colon: "threshold:fixed:150", "denoise:5", "crop:20".
+    """
+    stages = []
+    for item in spec.split(","):
+        name, *options = item.strip().split(":")
+        if name not in STAGES:
+            raise ValueError(f"Unknown preprocessing stage: {name}")
+        if name == Grayscale.name:
+            stages.append(Grayscale(order))
+        elif name == Threshold.name:
+            method = options[0] if options else "otsu"
+            if method == "fixed" and len(options) > 1:
+                stages.append(Threshold(method, value=int(options[1])))
+            elif method == "sauvola" and len(options) > 1:
+                stages.append(Threshold(method, window=int(options[1]),
+                                        k=float(options[2]) if len(options) > 2 else 0.2))
+            else:
+                stages.append(Threshold(method))
+        else:
+            stages.append(STAGES[name](*(_type_cast(o) for o in options)))
+    return PreprocessPipeline(stages)
+
+
+def _type_cast(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_pipeline(order="rgb", spec=DEFAULT_PIPELINE):
+    """Returns the shared pipeline for the given channel order ("rgb" for PIL, "bgr" for OpenCV)."""
+    key = (order, spec)
+    with _pipelines_lock:
+        if key not in _pipelines:
+            _pipelines[key] = build_pipeline(spec, order)
+        return _pipelines[key]
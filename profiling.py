@@ -0,0 +1,242 @@
+"""Per-stage timing spans for conversions, exported as JSONL records and Prometheus metrics.
+
+An entry point opens a request and the pipeline code marks its stages:
+
+    with profiling.request("cli"):
+        with span("ocr.recognize"):
+            ...
+
+Spans attach to the request active in the current context; SentencePipeline
+workers inherit it, so per-sentence synthesis is timed too. Each finished
+request becomes one timing record: appended to PROFILE_JSONL, aggregated into
+Prometheus metrics (the HTTP service serves them at /metrics; other entry points
+can write them to PROFILE_PROM_FILE).
+
+Profiling is off unless PROFILING=1 or a request is opened with enabled=True.
+When off, span() is a single context-variable lookup returning a shared no-op.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+PROFILING = os.environ.get("PROFILING", "0") == "1"
+# Append one JSON timing record per request to this file
+PROFILE_JSONL = os.environ.get("PROFILE_JSONL", "")
+# Rewrite Prometheus metrics to this file after every request (node_exporter textfile collector)
+PROFILE_PROM_FILE = os.environ.get("PROFILE_PROM_FILE", "")
+# Upper bounds (seconds) of the request duration histogram
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current = contextvars.ContextVar("timing_record", default=None)
+_NOOP = contextlib.nullcontext()
+
+
+class TimingRecord:
+    """Spans of one request: (stage, start offset, seconds), plus the entry point and labels."""
+
+    def __init__(self, entry, labels=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.entry = entry
+        self.labels = labels or {}
+        self.started = time.time()
+        self.total = None
+        self.spans = []
+        self._t0 = time.perf_counter()
+
+    def add(self, stage, seconds, started=None):
+        """Records a stage; `started` is its perf_counter() start, if known."""
+        offset = None if started is None else round(started - self._t0, 6)
+        # list.append is atomic, so worker threads can add spans concurrently
+        self.spans.append((stage, offset, seconds))
+
+    def merge(self, timings):
+        """Adds stage durations measured elsewhere (e.g. a {stage: seconds} dict from a worker process)."""
+        for stage, seconds in timings.items():
+            self.add(stage, seconds)
+
+    def totals(self):
+        """Seconds per stage, summed over repeated spans (parallel spans can exceed the wall time)."""
+        totals = {}
+        for stage, _, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def finish(self):
+        self.total = time.perf_counter() - self._t0
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "entry": self.entry,
+            "labels": self.labels,
+            "started": self.started,
+            "total": self.total,
+            "stages": {stage: round(seconds, 6) for stage, seconds in self.totals().items()},
+            "spans": [{"stage": stage, "start": offset, "seconds": round(seconds, 6)}
+                      for stage, offset, seconds in self.spans],
+        }
+
+
+class _Span:
+    __slots__ = ("record", "stage", "started")
+
+    def __init__(self, record, stage):
+        self.record = record
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record.add(self.stage, time.perf_counter() - self.started, self.started)
+
+
+def current():
+    """The timing record of the request running in this context, or None."""
+    return _current.get()
+
+
+def span(stage):
+    """Context manager timing a stage of the current request (a no-op outside one)."""
+    record = _current.get()
+    if record is None:
+        return _NOOP
+    return _Span(record, stage)
+
+
+def timed(stage):
+    """Decorator form of span()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start(entry, enabled=None, **labels):
+    """Starts a timing record, or returns None when profiling is disabled."""
+    if not (PROFILING if enabled is None else enabled):
+        return None
+    return TimingRecord(entry, labels)
+
+
+def finish(record, export_record=True):
+    """Ends a record started with start() and exports it; accepts None."""
+    if record is None:
+        return None
+    record.finish()
+    if export_record:
+        export(record.as_dict())
+    return record
+
+
+@contextlib.contextmanager
+def use(record):
+    """Makes `record` the current request for the enclosed block (nothing happens for None)."""
+    if record is None:
+        yield None
+        return
+    token = _current.set(record)
+    try:
+        yield record
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def request(entry, enabled=None, export_record=True, **labels):
+    """Times one request of an entry point; yields its TimingRecord, or None when disabled.
+
+    With export_record=False the caller exports record.as_dict() itself (e.g.
+    from the parent of a worker process).
+    """
+    record = start(entry, enabled, **labels)
+    with use(record):
+        try:
+            yield record
+        finally:
+            finish(record, export_record)
+
+
+def context_for(record):
+    """A copy of the current context with `record` as the current request.
+
+    Run work for a request on another thread with context.run(func, ...), one
+    call at a time.
+    """
+    context = contextvars.copy_context()
+    if record is not None:
+        context.run(_current.set, record)
+    return context
+
+
+class StageMetrics:
+    """Aggregated request and stage durations per entry point, rendered as Prometheus text."""
+
+    def __init__(self, buckets=REQUEST_BUCKETS):
+        self.buckets = buckets
+        self._stages = {}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def observe(self, record):
+        """Adds a record (as returned by TimingRecord.as_dict())."""
+        entry = record["entry"]
+        with self._lock:
+            for stage, seconds in record["stages"].items():
+                count, total = self._stages.get((entry, stage), (0, 0.0))
+                self._stages[(entry, stage)] = (count + 1, total + seconds)
+            if record["total"] is not None:
+                counts, count, total = self._requests.get(entry, ([0] * len(self.buckets), 0, 0.0))
+                counts = [n + (record["total"] <= bound) for n, bound in zip(counts, self.buckets)]
+                self._requests[entry] = (counts, count + 1, total + record["total"])
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP inktalk_stage_seconds Time spent in each pipeline stage, one observation per request.",
+            "# TYPE inktalk_stage_seconds summary",
+        ]
+        with self._lock:
+            for (entry, stage), (count, total) in sorted(self._stages.items()):
+                labels = f'entry="{entry}",stage="{stage}"'
+                lines.append(f"inktalk_stage_seconds_sum{{{labels}}} {total:.6f}")
+                lines.append(f"inktalk_stage_seconds_count{{{labels}}} {count}")
+            lines.append("# HELP inktalk_request_seconds End-to-end time of a profiled request.")
+            lines.append("# TYPE inktalk_request_seconds histogram")
+            for entry, (counts, count, total) in sorted(self._requests.items()):
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'inktalk_request_seconds_bucket{{entry="{entry}",le="{bound}"}} {n}')
+                lines.append(f'inktalk_request_seconds_bucket{{entry="{entry}",le="+Inf"}} {count}')
+                lines.append(f'inktalk_request_seconds_sum{{entry="{entry}"}} {total:.6f}')
+                lines.append(f'inktalk_request_seconds_count{{entry="{entry}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = StageMetrics()
+_export_lock = threading.Lock()
+
+
+def export(record):
+    """Aggregates a record dict into METRICS and writes it to the configured outputs."""
+    if record is None:
+        return
+    METRICS.observe(record)
+    with _export_lock:
+        if PROFILE_JSONL:
+            with open(PROFILE_JSONL, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        if PROFILE_PROM_FILE:
+            directory = os.path.dirname(PROFILE_PROM_FILE) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(METRICS.prometheus_text())
+            os.replace(tmp_path, PROFILE_PROM_FILE)
@@ -0,0 +1,240 @@
+"""Headless HTTP API for OCR and text-to-speech.
+
+Run with a single uvicorn worker (OCR already runs in its own process pool):
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+Endpoints:
+    POST /ocr            multipart "file"                  -> {"text", "scale", "timings"}
+    POST /tts            JSON {"text", "lang", "engine"}   -> streamed audio (chunked, one piece per sentence)
+    POST /note-to-audio  multipart "file" (+ "lang", "engine" form fields)
+                         -> streamed audio, recognized text in the X-Extracted-Text header
+                            (cut to EXTRACTED_TEXT_HEADER_CHARS characters; /ocr returns all of it)
+    GET  /health         queue depth and worker limits
+    GET  /metrics        per-stage timings in Prometheus text format (with PROFILING=1)
+
+When a queue is full the request is rejected with 503 and a Retry-After header
+instead of piling up.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
+from urllib.parse import quote
+
+import anyio
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+import profiling
+from conversion import extract_text_from_bytes, stream_speech
+from sysinfo import available_cores
+from tts_engine import TTS_ENGINE, TTS_ENGINES, get_tts_engine
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(available_cores())))
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "8"))
+# Requests allowed in flight (running or waiting for a worker) before new ones get 503
+MAX_PENDING = int(os.environ.get("MAX_PENDING", "64"))
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# Recognized text echoed in the X-Extracted-Text header; proxies reject headers much over 8 KB
+EXTRACTED_TEXT_HEADER_CHARS = int(os.environ.get("EXTRACTED_TEXT_HEADER_CHARS", "500"))
+
+
+class AdmissionControl:
+    """Bounded concurrency plus a bounded wait queue; overflow is rejected with 503."""
+
+    def __init__(self, name, concurrency, max_pending):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.pending = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def admit(self):
+        """Reserves a place in the queue or raises 503; returns a ticket to run under."""
+        if self.pending >= self.max_pending:
+            raise HTTPException(status_code=503, detail=f"{self.name} queue is full, retry later",
+                                headers={"Retry-After": "1"})
+        self.pending += 1
+        return _Ticket(self)
+
+    def stats(self):
+        return {"pending": self.pending, "max_pending": self.max_pending, "concurrency": self.concurrency}
+
+
+class _Ticket:
+    """`async with ticket:` waits for a worker slot; release() is idempotent."""
+
+    def __init__(self, control):
+        self._control = control
+        self._released = False
+
+    async def __aenter__(self):
+        with profiling.span(f"{self._control.name.lower()}.queue"):
+            await self._control._semaphore.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self._control._semaphore.release()
+        self.release()
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._control.pending -= 1
+
+
+ocr_admission = AdmissionControl("OCR", OCR_WORKERS, MAX_PENDING)
+tts_admission = AdmissionControl("TTS", TTS_CONCURRENCY, MAX_PENDING)
+executors = {}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    executors["ocr"] = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+    executors["tts"] = ThreadPoolExecutor(max_workers=TTS_CONCURRENCY, thread_name_prefix="tts-wait")
+    yield
+    executors.pop("ocr").shutdown(cancel_futures=True)
+    executors.pop("tts").shutdown(cancel_futures=True)
+
+
+app = FastAPI(title="InkTalk API", lifespan=lifespan)
+
+
+class TTSRequest(BaseModel):
+    text: str
+    lang: str = "en"
+    engine: str = TTS_ENGINE
+
+
+def check_engine(engine):
+    if engine not in TTS_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown TTS engine: {engine}")
+    return get_tts_engine(engine)
+
+
+async def run_ocr(file):
+    with profiling.span("upload.read"):
+        data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+
+    ticket = ocr_admission.admit()
+    async with ticket:
+        loop = asyncio.get_running_loop()
+        try:
+            with profiling.span("ocr.worker"):
+                result = await loop.run_in_executor(executors["ocr"], extract_text_from_bytes, data)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=f"OCR failed: {e}")
+    record = profiling.current()
+    if record is not None:
+        # Stages timed inside the worker process
+        record.merge(result["timings"])
+    return result
+
+
+async def speech_stream(ticket, text, lang, engine, record=None):
+    """Yields encoded audio as sentences finish, holding a TTS slot for the duration of the stream.
+
+    `record` (a profiling.TimingRecord or None) is finished when the stream ends.
+    """
+    # Synthesis spans reach the record through this context on the worker threads
+    context = profiling.context_for(record)
+    waited = time.perf_counter()
+    async with ticket:
+        if record is not None:
+            record.add("tts.queue", time.perf_counter() - waited, waited)
+        loop = asyncio.get_running_loop()
+        chunks = stream_speech(text, lang, engine)
+        step = None
+        try:
+            while True:
+                # The generator blocks on synthesis, so step it on a worker thread
+                step = executors["tts"].submit(context.run, next, chunks, None)
+                chunk = await asyncio.wrap_future(step)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # Shielded: after a client disconnect this scope is cancelled, but the sentence
+            # pipeline still has to be closed and the record finished
+            with anyio.CancelScope(shield=True):
+                await loop.run_in_executor(executors["tts"], close_stream, chunks, step, context)
+            profiling.finish(record)
+
+
+def close_stream(chunks, step, context):
+    """Closes a speech generator in `context` once the step in flight on another thread (if any) has returned."""
+    if step is not None:
+        # A step still queued is dropped; one already running holds both the generator and the context
+        step.cancel()
+        wait([step])
+    context.run(chunks.close)
+
+
+def speech_response(text, lang, engine, headers=None, record=None):
+    tts_engine = check_engine(engine)
+    ticket = tts_admission.admit()
+    if record is None:
+        record = profiling.start("server.tts", engine=engine)
+    return StreamingResponse(
+        speech_stream(ticket, text, lang, engine, record),
+        media_type=tts_engine.mime,
+        headers=headers,
+        # Frees the queue slot even if the client disconnects before streaming starts
+        background=BackgroundTask(ticket.release),
+    )
+
+
+def extracted_text_headers(text):
+    """X-Extracted-Text (percent-encoded), cut to EXTRACTED_TEXT_HEADER_CHARS with X-Extracted-Text-Truncated set."""
+    headers = {"X-Extracted-Text": quote(text[:EXTRACTED_TEXT_HEADER_CHARS])}
+    if len(text) > EXTRACTED_TEXT_HEADER_CHARS:
+        headers["X-Extracted-Text-Truncated"] = "true"
+    return headers
+
+
+@app.post("/ocr")
+async def ocr(file: UploadFile = File(...)):
+    with profiling.request("server.ocr"):
+        return await run_ocr(file)
+
+
+@app.post("/tts")
+async def tts(request: TTSRequest):
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="No text to synthesize")
+    return speech_response(request.text, request.lang, request.engine)
+
+
+@app.post("/note-to-audio")
+async def note_to_audio(file: UploadFile = File(...), lang: str = Form("en"), engine: str = Form(TTS_ENGINE)):
+    check_engine(engine)
+    # One timing record covers the OCR and the audio stream that follows
+    record = profiling.start("server.note_to_audio", engine=engine)
+    try:
+        with profiling.use(record):
+            result = await run_ocr(file)
+        text = result["text"]
+        if not text:
+            raise HTTPException(status_code=422, detail="No text could be extracted from the image")
+        return speech_response(text, lang, engine, headers=extracted_text_headers(text), record=record)
+    except BaseException:
+        # Once the stream is returned it finishes the record; before that nothing else will
+        profiling.finish(record)
+        raise
+
+
+@app.get("/health")
+async def health():
+    return {"ocr": ocr_admission.stats(), "tts": tts_admission.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(profiling.METRICS.prometheus_text(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,122 @@
+"""One-time initialization shared by the Streamlit pages.
+
+Streamlit re-executes a page script top to bottom on every interaction. The
+resources here are built once per server process through st.cache_resource and
+reused by every rerun and session; optional subsystems (command recognition,
+pydub) are imported only when a page first needs them.
+"""
+import os
+import platform
+import shutil
+import time
+
+import streamlit as st
+
+# Seconds spent building each resource the first time it was requested
+STARTUP_TIMINGS = {}
+
+
+def _timed(name, build):
+    t0 = time.perf_counter()
+    value = build()
+    STARTUP_TIMINGS[name] = time.perf_counter() - t0
+    return value
+
+
+@st.cache_resource(show_spinner=False)
+def load_output_dir():
+    """Creates the audio directory once and checks it is writable."""
+    def build():
+        from tts_cache import TTS_CACHE_DIR
+        os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+        if not os.access(TTS_CACHE_DIR, os.W_OK):
+            raise Exception("Audio output directory is not writable")
+        return TTS_CACHE_DIR
+    return _timed("output_dir", build)
+
+
+@st.cache_resource(show_spinner=False)
+def load_ocr(order, lang, config):
+    """Preprocessing pipeline and warm Tesseract pool for a page's image format."""
+    def build():
+        import pytesseract
+        from ocr_engine import get_engine_pool
+        from preprocess import get_pipeline
+
+        # Set up Tesseract path
+        if platform.system() == "Darwin":  # macOS
+            pytesseract.pytesseract.tesseract_cmd = r"/opt/homebrew/bin/tesseract"
+        else:  # Linux (Streamlit Cloud) or Windows
+            pytesseract.pytesseract.tesseract_cmd = r"/usr/bin/tesseract"
+        return get_pipeline(order), get_engine_pool(lang, config)
+    return _timed("ocr", build)
+
+
+@st.cache_resource(show_spinner=False)
+def load_tts_engines():
+    """Speech engines installed on this machine (probes imports and PATH once)."""
+    def build():
+        from tts_engine import available_tts_engines
+        return available_tts_engines()
+    return _timed("tts_engines", build)
+
+
+@st.cache_resource(show_spinner=False)
+def find_ffmpeg():
+    """Path of the ffmpeg binary used by pydub, or None."""
+    return _timed("ffmpeg", lambda: shutil.which("ffmpeg"))
+
+
+def load_recognizer():
+    """A voice-command recognizer for one session's listener (offline when a model or templates exist).
+
+    Not a shared resource: streaming recognizers hold per-stream state. The model
+    or templates behind them are loaded once per process by command_recognizer.
+    """
+    def build():
+        from command_recognizer import create_recognizer
+        return create_recognizer()
+    return _timed("recognizer", build)
+
+
+@st.cache_resource(show_spinner=False)
+def load_playback_registry():
+    """Playback controllers of all sessions in this process, one per session."""
+    from playback import SessionRegistry
+    return SessionRegistry()
+
+
+def session_id():
+    """Id of the browser session running this script."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    return get_script_run_ctx().session_id
+
+
+def session_playback():
+    """The current session's PlaybackController; controllers of closed sessions are shut down."""
+    from streamlit.runtime import get_instance
+
+    registry = load_playback_registry()
+    registry.reap(get_instance().is_active_session)
+    return registry.get(session_id())
+
+
+@st.cache_resource(show_spinner=False)
+def load_job_manager():
+    """OCR and TTS worker pools shared by every session (OCR_JOB_WORKERS / TTS_JOB_WORKERS)."""
+    from jobs import JobManager
+    return JobManager()
+
+
+def job_manager():
+    """The shared JobManager; jobs of closed sessions are cancelled first."""
+    from streamlit.runtime import get_instance
+
+    manager = load_job_manager()
+    manager.reap(get_instance().is_active_session)
+    return manager
+
+
+def record_rerun(started):
+    """Stores how long this script run took, in ms, as st.session_state["rerun_ms"]."""
+    st.session_state["rerun_ms"] = (time.perf_counter() - started) * 1000
@@ -1,13 +1,18 @@
 import streamlit as st
-from gtts import gTTS
-import pytesseract
 from PIL import Image
-import cv2
-import numpy as np
 import io
-import platform
-import os
 import time
+from tts_engine import TTS_ENGINE, get_tts_engine
+from conversion import text_to_speech
+from conversion_ui import (download_audio, process_document, select_source, select_tts_engine, show_conversion,
+                           show_success, show_timings, submit_conversion, timings_enabled)
+from documents import is_document
+from transcript import SpeechTranscript
+import profiling
+from startup import record_rerun
+
+# Script runs are timed from here (imports are already cached after the first run)
+RERUN_STARTED = time.perf_counter()
 
 # Set page configuration and custom theme
 st.set_page_config(
@@ -92,74 +97,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Set up Tesseract path
-if platform.system() == "Darwin":  # macOS
-    pytesseract.pytesseract.tesseract_cmd = r"/opt/homebrew/bin/tesseract"
-else:  # Linux (Streamlit Cloud) or Windows
-    pytesseract.pytesseract.tesseract_cmd = r"/usr/bin/tesseract"
-
-def preprocess_image(image):
-    # Convert to OpenCV format
-    img_array = np.array(image)
-    
-    # Convert to grayscale
-    gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-    
-    # Apply thresholding
-    _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
-    
-    return binary
-
-def extract_text(image):
-    # Preprocess the image
-    processed_image = preprocess_image(image)
-    
-    # Extract text using Tesseract
-    custom_config = r'--oem 3 --psm 6'
-    text = pytesseract.image_to_string(processed_image, config=custom_config)
-    
-    return text.strip()
-
-# Add this after imports
-OUTPUT_DIR = "audio_output"
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
-
-def text_to_speech(text, output_file="output.mp3"):
-    output_path = os.path.join(OUTPUT_DIR, output_file)
-    
-    # Ensure output directory exists and is writable
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-    elif not os.access(OUTPUT_DIR, os.W_OK):
-        raise Exception("Audio output directory is not writable")
-    
-    try:
-        # Create gTTS object and save to file
-        tts = gTTS(text=text, lang='en')
-        tts.save(output_path)
-        
-        # Verify the file was created and is readable
-        if not os.path.exists(output_path):
-            raise Exception("Failed to generate audio file")
-        if not os.access(output_path, os.R_OK):
-            raise Exception("Generated audio file is not readable")
-        
-        # Verify file size is greater than 0
-        if os.path.getsize(output_path) == 0:
-            raise Exception("Generated audio file is empty")
-            
-        return output_path
-    
-    except Exception as e:
-        # Clean up any partially created file
-        if os.path.exists(output_path):
-            try:
-                os.remove(output_path)
-            except:
-                pass
-        raise Exception(f"Error generating audio: {str(e)}")
-
 def main():
     # Main title with gradient effect
     st.title("🔮 InkTalk")
@@ -175,6 +112,10 @@ def main():
         </p>
     """, unsafe_allow_html=True)
     
+    # Speech engine used for this conversion
+    engine = select_tts_engine()
+    profile = timings_enabled()
+    
     # Create two columns for better layout
     col1, col2 = st.columns([2, 1])
 
@@ -193,13 +134,17 @@ def main():
         if "📤 Upload Image" in input_method:
             # Enhanced file uploader
             uploaded_file = st.file_uploader(
-                "Drop your image here or click to browse",
-                type=['png', 'jpg', 'jpeg'],
-                help="Supported formats: PNG, JPG, JPEG"
+                "Drop your image or scanned notebook here or click to browse",
+                type=['png', 'jpg', 'jpeg', 'pdf', 'tif', 'tiff'],
+                help="Supported formats: PNG, JPG, JPEG, and multi-page PDF or TIFF"
             )
             if uploaded_file is not None:
+                select_source(uploaded_file)
+            if uploaded_file is not None and is_document(uploaded_file.name):
+                process_document(uploaded_file.getvalue(), uploaded_file.name, show_audio, engine, profile)
+            elif uploaded_file is not None:
                 image = Image.open(uploaded_file)
-                process_image(image)
+                process_image(image, engine, profile)
         else:
             # Enhanced camera input
             camera_image = st.camera_input(
@@ -207,8 +152,9 @@ def main():
                 help="Make sure you have good lighting!"
             )
             if camera_image is not None:
+                select_source(camera_image)
                 image = Image.open(camera_image)
-                process_image(image)
+                process_image(image, engine, profile)
                 
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -235,7 +181,7 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
-def process_image(image):
+def process_image(image, engine=TTS_ENGINE, profile=False):
     # Display image with enhanced styling
     st.markdown("""
         <div style='background: rgba(255,255,255,0.05); padding: 1rem; border-radius: 15px; margin: 1rem 0;'>
@@ -246,63 +192,68 @@ def process_image(image):
 
     # Enhanced conversion button
     if st.button('✨ Convert to Text and Speech ✨'):
-        with st.spinner('Processing image...'):
-            # Extract text
-            text = extract_text(image)
+        try:
+            st.session_state['job_id'] = submit_conversion(image, engine, profile, after_speech=keep_transcript)
+        except Exception as e:
+            st.error(f"Error starting conversion: {str(e)}")
+
+    show_conversion(show_audio)
+    edit_transcript(engine)
+
+def keep_transcript(job, text):
+    # Keep the sentence clips (just cached) so corrections only re-synthesize what changed
+    transcript = SpeechTranscript(engine=job.result['engine'], synthesize=text_to_speech)
+    transcript.update(text)
+    job.result['transcript'] = transcript
+
+def show_audio(job, text, audio_path):
+    # Enhanced audio section with modern styling
+    st.markdown("""
+        <div style='background: rgba(255,255,255,0.05); padding: 1.5rem; border-radius: 15px; margin: 1rem 0;'>
+            <h4 style='color: #4facfe; margin-bottom: 1rem;'>🎵 Audio Output</h4>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    # Create columns for audio player and download button
+    audio_col1, audio_col2 = st.columns([3, 1])
+    engine = job.result['engine']
+    with audio_col1:
+        st.audio(audio_path, format=get_tts_engine(engine).mime)
+    
+    with audio_col2:
+        download_audio(audio_path, engine, help='Download the audio file to your device')
+    
+    # Add success message
+    show_success()
+
+def edit_transcript(engine=TTS_ENGINE):
+    # Editable transcript of the last conversion; an edit re-synthesizes only the changed sentences
+    transcript = st.session_state.get('transcript')
+    if transcript is None or transcript.engine != engine:
+        return
+    
+    edited = st.text_area("✏️ Fix OCR mistakes", value=transcript.text, height=200,
+                          help="Only the sentences you change are converted to speech again")
+    if st.button('🔁 Update Audio'):
+        try:
+            started = time.perf_counter()
+            with st.spinner('Updating audio...'), profiling.request(
+                    "streamlit.edit", enabled=st.session_state.get('show_timings'), engine=engine) as record:
+                changed = transcript.update(edited)
+                with profiling.span("audio.splice"):
+                    audio_path = transcript.save()
+            if record is not None:
+                st.session_state['timing_record'] = record.as_dict()
+            st.caption(f"🔁 Re-synthesized {len(changed)} of {len(transcript.sentences)} sentences "
+                       f"in {time.perf_counter() - started:.1f} s")
             
-            if text:
-                # Display extracted text with custom styling
-                st.markdown("""
-                    <div style='background: rgba(255,255,255,0.05); padding: 1.5rem; border-radius: 15px; margin: 1rem 0;'>
-                        <h4 style='color: #4facfe; margin-bottom: 1rem;'>📝 Extracted Text</h4>
-                    </div>
-                """, unsafe_allow_html=True)
-                st.markdown(f"<div style='padding: 1rem; background: rgba(255,255,255,0.02); border-radius: 10px;'>{text}</div>", unsafe_allow_html=True)
-                
-                try:
-                    # Convert to speech
-                    output_file = f"output_{int(time.time())}.mp3"
-                    output_path = text_to_speech(text, output_file)
-                    
-                    # Create audio player
-                    if os.path.exists(output_path):
-                        # Read the audio file once and store in memory
-                        with open(output_path, "rb") as audio_file:
-                            audio_bytes = audio_file.read()
-                        
-                        # Enhanced audio section with modern styling
-                        st.markdown("""
-                            <div style='background: rgba(255,255,255,0.05); padding: 1.5rem; border-radius: 15px; margin: 1rem 0;'>
-                                <h4 style='color: #4facfe; margin-bottom: 1rem;'>🎵 Audio Output</h4>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Create columns for audio player and download button
-                        audio_col1, audio_col2 = st.columns([3, 1])
-                        
-                        with audio_col1:
-                            st.audio(audio_bytes, format='audio/mp3')
-                        
-                        with audio_col2:
-                            # Stylish download button
-                            st.download_button(
-                                label='💾 Download',
-                                data=audio_bytes,
-                                file_name='handwriting_audio.mp3',
-                                mime='audio/mp3',
-                                help='Download the audio file to your device'
-                            )
-                        
-                        # Add success message
-                        st.markdown("""
-                            <div class='success'>
-                                ✨ Audio generated successfully! Click play to listen or download to save.
-                            </div>
-                        """, unsafe_allow_html=True)
-                except Exception as e:
-                    st.error(f"Error generating audio: {str(e)}")
-            else:
-                st.error("No text could be extracted from the image. Please try with a clearer image.")
+            st.audio(audio_path, format=get_tts_engine(engine).mime)
+            download_audio(audio_path, engine, key='download_edited',
+                           help='Download the corrected audio file to your device')
+        except Exception as e:
+            st.error(f"Error generating audio: {str(e)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    show_timings()
+    record_rerun(RERUN_STARTED)
\ No newline at end of file
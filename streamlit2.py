@@ -1,23 +1,23 @@
 import streamlit as st
-from gtts import gTTS
-import pytesseract
 from PIL import Image
-import cv2
-import numpy as np
 import io
-import platform
-import os
 import time
-import speech_recognition as sr
-from pydub import AudioSegment
-from pydub.playback import play
-import threading
-import queue
-import shutil
+from tts_pipeline import split_sentences
+from tts_engine import TTS_ENGINE, get_tts_engine
+from conversion import text_to_speech
+from conversion_ui import (download_audio, process_document, select_source, select_tts_engine, show_conversion,
+                           show_success, show_timings, submit_conversion, timings_enabled)
+from documents import is_document
+from startup import find_ffmpeg, load_recognizer, record_rerun, session_playback
+from voice_control import CommandListener, MicrophoneSource
+from audio_assembly import SentenceAudio, Speaker
 
-# Check for ffmpeg installation
+# Script runs are timed from here (imports are already cached after the first run)
+RERUN_STARTED = time.perf_counter()
+
+# Check for ffmpeg installation (looked up once per process)
 def check_ffmpeg():
-    if shutil.which('ffmpeg') is None:
+    if find_ffmpeg() is None:
         st.error("⚠️ ffmpeg is not installed. Audio playback may not work properly.\nPlease install ffmpeg:\n- On macOS: `brew install ffmpeg`\n- On Linux: `sudo apt-get install ffmpeg`\n- On Windows: Download from https://ffmpeg.org/download.html")
         return False
     return True
@@ -105,186 +105,52 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Set up Tesseract path
-if platform.system() == "Darwin":  # macOS
-    pytesseract.pytesseract.tesseract_cmd = r"/opt/homebrew/bin/tesseract"
-else:  # Linux (Streamlit Cloud) or Windows
-    pytesseract.pytesseract.tesseract_cmd = r"/usr/bin/tesseract"
-
-def preprocess_image(image):
-    # Convert to OpenCV format
-    img_array = np.array(image)
-    
-    # Convert to grayscale
-    gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-    
-    # Apply thresholding
-    _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
-    
-    return binary
-
-def extract_text(image):
-    # Preprocess the image
-    processed_image = preprocess_image(image)
-    
-    # Extract text using Tesseract
-    custom_config = r'--oem 3 --psm 6'
-    text = pytesseract.image_to_string(processed_image, config=custom_config)
-    
-    return text.strip()
-
-# Add this after imports
-OUTPUT_DIR = "audio_output"
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
-
-# Global variables for audio control
-audio_control = {
-    'is_playing': False,
-    'should_stop': False,
-    'audio_thread': None,
-    'command_queue': queue.Queue(),
-    'current_position': 0,  # Track current position in audio
-    'current_text': '',     # Store current text being read
-    'sentences': []         # Store text split into sentences
-}
-
-def listen_for_commands():
-    recognizer = sr.Recognizer()
-    # Initialize microphone once outside the loop
+def start_voice_control():
+    # The microphone stays open for the whole session; commands are recognized locally
+    # when a Vosk model or recorded templates exist (VOICE_RECOGNIZER), else by Google.
+    # 'play' and 'stop' arrive mapped to 'resume' and 'pause'
     try:
-        mic = sr.Microphone()
-        with mic as source:
-            # Initial ambient noise adjustment
-            recognizer.adjust_for_ambient_noise(source, duration=1)
+        session_playback().attach_listener(CommandListener(MicrophoneSource(), load_recognizer()))
     except Exception as e:
         st.error(f"Error initializing microphone: {str(e)}")
-        return
-
-    while not audio_control['should_stop']:
-        try:
-            with mic as source:
-                # Shorter timeout for better responsiveness
-                audio = recognizer.listen(source, timeout=2, phrase_time_limit=3)
-                command = recognizer.recognize_google(audio).lower()
-                st.write(f"Recognized command: {command}")
-                
-                if command in ['pause', 'resume', 'repeat', 'skip', 'stop', 'play']:
-                    st.session_state['last_command'] = command
-                    
-                    # Map 'play' to 'resume' for consistency
-                    if command == 'play':
-                        command = 'resume'
-                    elif command == 'stop':
-                        command = 'pause'
-                    
-                    audio_control['command_queue'].put(command)
-                    
-                    if command == 'pause':
-                        audio_control['is_playing'] = False
-                        st.write("⏸️ Audio paused")
-                    elif command == 'resume':
-                        audio_control['is_playing'] = True
-                        st.write("▶️ Audio resumed")
-                    elif command == 'repeat':
-                        st.write("🔄 Repeating current sentence")
-                        # Stay on current sentence
-                        pass
-                    elif command == 'skip':
-                        if audio_control['current_position'] < len(audio_control['sentences']) - 1:
-                            audio_control['current_position'] += 1
-                            st.write("⏭️ Skipped to next sentence")
-                        else:
-                            st.write("📌 Already at the last sentence")
-        except sr.WaitTimeoutError:
-            # Silent timeout - normal operation
-            pass
-        except sr.UnknownValueError:
-            # Silent unknown command - normal operation
-            pass
-        except sr.RequestError as e:
-            st.error(f"Could not request results from speech recognition service: {str(e)}")
-        except Exception as e:
-            st.error(f"Error in voice recognition: {str(e)}")
-            
-        # Small delay to prevent CPU overuse
-        time.sleep(0.1)
+        return False
+    return True
 
-def play_audio_with_controls(text):
-    audio_control['current_text'] = text
-    audio_control['sentences'] = text.split('.')
-    audio_control['current_position'] = 0
-    audio_control['is_playing'] = True
+def play_audio_with_controls(text, engine=TTS_ENGINE):
+    # Playback state belongs to this browser session only; the playback thread waits
+    # on a condition while paused and is joined when the session ends
+    sentences = split_sentences(text)
     
-    while audio_control['current_position'] < len(audio_control['sentences']):
-        if audio_control['is_playing']:
-            current_sentence = audio_control['sentences'][audio_control['current_position']].strip()
-            if current_sentence:  # Skip empty sentences
-                tts = gTTS(text=current_sentence, lang='en')
-                fp = io.BytesIO()
-                tts.write_to_fp(fp)
-                fp.seek(0)
-                
-                audio = AudioSegment.from_file(fp, format="mp3")
-                play(audio)
-                
-                # Move to next sentence unless paused or repeating
-                if not audio_control['command_queue'].empty():
-                    command = audio_control['command_queue'].get()
-                    if command == 'skip':
-                        continue  # Skip handled in listen_for_commands
-                    elif command == 'repeat':
-                        continue  # Stay on current sentence
-                    elif command == 'pause':
-                        while not audio_control['is_playing']:
-                            time.sleep(0.1)
-                else:
-                    audio_control['current_position'] += 1
-        
-        time.sleep(0.1)  # Prevent CPU overuse
+    # Upcoming sentences are synthesized and decoded to PCM in the background; decoded sentences
+    # stay in a ring buffer (O(1) repeat/skip) and play back to back on one output stream
+    audio = SentenceAudio(sentences, lambda sentence: text_to_speech(sentence, engine=engine),
+                          get_tts_engine(engine).format)
+    speaker = Speaker()
+    
+    def cleanup():
+        audio.close()
+        speaker.close()
+    
+    session_playback().start(sentences, audio.clip_for, speaker, cleanup)
+
+def show_playback_status():
+    # Where this session's voice-controlled playback is, as of this rerun
+    status = session_playback().snapshot()
+    if status['total']:
+        state = "▶️ Playing" if status['playing'] else "⏸️ Paused"
+        st.sidebar.caption(f"{state} · sentence {min(status['position'] + 1, status['total'])}/{status['total']}"
+                           + (f" · last command: {status['last_command']}" if status['last_command'] else ""))
 
 def play_audio_file(audio_path):
+    from pydub import AudioSegment
+    from pydub.playback import play
+    
     try:
         audio = AudioSegment.from_mp3(audio_path)
         play(audio)
     except Exception as e:
         print(f"Error playing audio: {str(e)}")
 
-def text_to_speech(text, output_file="output.mp3"):
-    output_path = os.path.join(OUTPUT_DIR, output_file)
-    
-    # Ensure output directory exists and is writable
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-    elif not os.access(OUTPUT_DIR, os.W_OK):
-        raise Exception("Audio output directory is not writable")
-    
-    try:
-        # Create gTTS object and save to file
-        tts = gTTS(text=text, lang='en')
-        tts.save(output_path)
-        
-        # Verify the file was created and is readable
-        if not os.path.exists(output_path):
-            raise Exception("Failed to generate audio file")
-        if not os.access(output_path, os.R_OK):
-            raise Exception("Generated audio file is not readable")
-        
-        # Verify file size is greater than 0
-        if os.path.getsize(output_path) == 0:
-            raise Exception("Generated audio file is empty")
-            
-        return output_path
-    
-    except Exception as e:
-        # Clean up any partially created file
-        if os.path.exists(output_path):
-            try:
-                os.remove(output_path)
-            except:
-                pass
-        raise Exception(f"Error generating audio: {str(e)}")
-
 def main():
     # Check for ffmpeg installation
     check_ffmpeg()
@@ -303,6 +169,11 @@ def main():
         </p>
     """, unsafe_allow_html=True)
     
+    # Speech engine used for this conversion
+    engine = select_tts_engine()
+    profile = timings_enabled()
+    show_playback_status()
+    
     # Create two columns for better layout
     col1, col2 = st.columns([2, 1])
 
@@ -321,13 +192,17 @@ def main():
         if "📤 Upload Image" in input_method:
             # Enhanced file uploader
             uploaded_file = st.file_uploader(
-                "Drop your image here or click to browse",
-                type=['png', 'jpg', 'jpeg'],
-                help="Supported formats: PNG, JPG, JPEG"
+                "Drop your image or scanned notebook here or click to browse",
+                type=['png', 'jpg', 'jpeg', 'pdf', 'tif', 'tiff'],
+                help="Supported formats: PNG, JPG, JPEG, and multi-page PDF or TIFF"
             )
             if uploaded_file is not None:
+                select_source(uploaded_file)
+            if uploaded_file is not None and is_document(uploaded_file.name):
+                process_document(uploaded_file.getvalue(), uploaded_file.name, show_audio, engine, profile)
+            elif uploaded_file is not None:
                 image = Image.open(uploaded_file)
-                process_image(image)
+                process_image(image, engine, profile)
         else:
             # Enhanced camera input
             camera_image = st.camera_input(
@@ -335,8 +210,9 @@ def main():
                 help="Make sure you have good lighting!"
             )
             if camera_image is not None:
+                select_source(camera_image)
                 image = Image.open(camera_image)
-                process_image(image)
+                process_image(image, engine, profile)
                 
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -363,7 +239,7 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
-def process_image(image):
+def process_image(image, engine=TTS_ENGINE, profile=False):
     # Display image with enhanced styling
     st.markdown("""
         <div style='background: rgba(255,255,255,0.05); padding: 1rem; border-radius: 15px; margin: 1rem 0;'>
@@ -374,87 +250,53 @@ def process_image(image):
 
     # Enhanced conversion button
     if st.button('✨ Convert to Text and Speech ✨'):
-        with st.spinner('Processing image...'):
-            # Extract text
-            text = extract_text(image)
-            
-            if text:
-                # Display extracted text with custom styling
-                st.markdown("""
-                    <div style='background: rgba(255,255,255,0.05); padding: 1.5rem; border-radius: 15px; margin: 1rem 0;'>
-                        <h4 style='color: #4facfe; margin-bottom: 1rem;'>📝 Extracted Text</h4>
-                    </div>
-                """, unsafe_allow_html=True)
-                st.markdown(f"<div style='padding: 1rem; background: rgba(255,255,255,0.02); border-radius: 10px;'>{text}</div>", unsafe_allow_html=True)
-                
-                try:
-                    # Convert to speech
-                    output_file = f"output_{int(time.time())}.mp3"
-                    output_path = text_to_speech(text, output_file)
-                    
-                    # Create audio player
-                    if os.path.exists(output_path):
-                        # Read the audio file once and store in memory
-                        with open(output_path, "rb") as audio_file:
-                            audio_bytes = audio_file.read()
-                        
-                        # Enhanced audio section with modern styling
-                        st.markdown("""
-                            <div style='background: rgba(255,255,255,0.05); padding: 1.5rem; border-radius: 15px; margin: 1rem 0;'>
-                                <h4 style='color: #4facfe; margin-bottom: 1rem;'>🎵 Audio Controls</h4>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Create columns for audio player, voice control, and download button
-                        audio_col1, audio_col2, audio_col3 = st.columns([2, 1, 1])
-                        
-                        with audio_col1:
-                            st.audio(audio_bytes, format='audio/mp3')
-                        
-                        with audio_col2:
-                            # Voice control section
-                            st.markdown("""
-                                <div style='background: rgba(79,172,254,0.1); padding: 1rem; border-radius: 10px;'>
-                                    <h5 style='color: #4facfe; margin-bottom: 0.5rem;'>🎤 Voice Commands</h5>
-                                    <small style='color: #888;'>Say:</small>
-                                    <ul style='margin: 0; padding-left: 1.2rem;'>
-                                        <li>"Play"</li>
-                                        <li>"Pause"</li>
-                                        <li>"Stop"</li>
-                                        <li>"Read"</li>
-                                    </ul>
-                                </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # Start voice command listener
-                            if st.button('🎤 Start Voice Control'):
-                                audio_control['should_stop'] = False
-                                audio_control['audio_thread'] = threading.Thread(
-                                    target=listen_for_commands,
-                                    daemon=True
-                                )
-                                audio_control['audio_thread'].start()
-                        
-                        with audio_col3:
-                            # Stylish download button
-                            st.download_button(
-                                label='💾 Download',
-                                data=audio_bytes,
-                                file_name='handwriting_audio.mp3',
-                                mime='audio/mp3',
-                                help='Download the audio file to your device'
-                            )
-                        
-                        # Add success message
-                        st.markdown("""
-                            <div class='success'>
-                                ✨ Audio generated successfully! Click play to listen or download to save.
-                            </div>
-                        """, unsafe_allow_html=True)
-                except Exception as e:
-                    st.error(f"Error generating audio: {str(e)}")
-            else:
-                st.error("No text could be extracted from the image. Please try with a clearer image.")
+        try:
+            st.session_state['job_id'] = submit_conversion(image, engine, profile)
+        except Exception as e:
+            st.error(f"Error starting conversion: {str(e)}")
+
+    show_conversion(show_audio)
+
+def show_audio(job, text, audio_path):
+    # Enhanced audio section with modern styling
+    st.markdown("""
+        <div style='background: rgba(255,255,255,0.05); padding: 1.5rem; border-radius: 15px; margin: 1rem 0;'>
+            <h4 style='color: #4facfe; margin-bottom: 1rem;'>🎵 Audio Controls</h4>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    # Create columns for audio player, voice control, and download button
+    audio_col1, audio_col2, audio_col3 = st.columns([2, 1, 1])
+    engine = job.result['engine']
+    with audio_col1:
+        st.audio(audio_path, format=get_tts_engine(engine).mime)
+    
+    with audio_col2:
+        # Voice control section
+        st.markdown("""
+            <div style='background: rgba(79,172,254,0.1); padding: 1rem; border-radius: 10px;'>
+                <h5 style='color: #4facfe; margin-bottom: 0.5rem;'>🎤 Voice Commands</h5>
+                <small style='color: #888;'>Say:</small>
+                <ul style='margin: 0; padding-left: 1.2rem;'>
+                    <li>"Play"</li>
+                    <li>"Pause"</li>
+                    <li>"Stop"</li>
+                    <li>"Read"</li>
+                </ul>
+            </div>
+        """, unsafe_allow_html=True)
+        
+        # Start voice command listener and read the note sentence by sentence
+        if st.button('🎤 Start Voice Control') and start_voice_control():
+            play_audio_with_controls(text, engine)
+    
+    with audio_col3:
+        download_audio(audio_path, engine, help='Download the audio file to your device')
+    
+    # Add success message
+    show_success()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    show_timings()
+    record_rerun(RERUN_STARTED)
\ No newline at end of file
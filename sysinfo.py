@@ -0,0 +1,9 @@
+"""Dependency-free facts about the machine, safe to import from any module."""
+import os
+
+
+def available_cores():
+    """Number of CPUs this process may actually run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
@@ -0,0 +1,83 @@
+"""Editable transcripts: re-synthesize only the sentences a correction touched.
+
+A SpeechTranscript keeps a note's sentences next to the TTS cache keys of their
+audio clips, not the clips themselves, so a session holds only text. When the
+text is edited, the new sentence list is diffed against the old one; clips of
+unchanged sentences are reused from the cache, only inserted or rewritten
+sentences are synthesized (in parallel), and the clips are read back one at a
+time and spliced into one file.
+"""
+import difflib
+
+from audio_stream import encode_stream
+from conversion import text_to_speech
+from tts_cache import audio_key, get_tts_cache, normalize_text
+from tts_engine import TTS_ENGINE, get_tts_engine
+from tts_pipeline import SentencePipeline, split_sentences
+
+
+def diff_sentences(old, new):
+    """Maps each new sentence to the index of an identical old one, or None if it changed.
+
+    Sentences are compared with whitespace collapsed, so re-wrapped lines do not
+    count as edits.
+    """
+    matcher = difflib.SequenceMatcher(a=[normalize_text(s) for s in old],
+                                      b=[normalize_text(s) for s in new], autojunk=False)
+    sources = [None] * len(new)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            sources[j1:j2] = range(i1, i2)
+    return sources
+
+
+class SpeechTranscript:
+    """A note's sentences and their clips' cache keys, updated incrementally as the text is edited.
+
+    `synthesize(sentence, lang, engine)` must leave the clip in the TTS cache, as
+    conversion.text_to_speech does; a clip evicted since is synthesized again when read.
+    """
+
+    def __init__(self, lang="en", engine=TTS_ENGINE, synthesize=text_to_speech):
+        self.lang = lang
+        self.engine = engine
+        self.format = get_tts_engine(engine).format
+        self.synthesize = synthesize
+        self.text = ""
+        self.sentences = []
+        self.keys = []
+
+    def update(self, text):
+        """Brings the audio in line with `text`; returns the indices of re-synthesized sentences."""
+        sentences = split_sentences(text)
+        sources = diff_sentences(self.sentences, sentences)
+        changed = [index for index, source in enumerate(sources) if source is None]
+
+        if changed:
+            # The clips land in the TTS cache; only their keys are kept
+            with SentencePipeline([sentences[index] for index in changed],
+                                  lambda sentence: self.synthesize(sentence, self.lang, self.engine)) as pipeline:
+                for _ in pipeline:
+                    pass
+
+        self.text, self.sentences = text, sentences
+        self.keys = [audio_key(sentence, self.lang, self.engine) for sentence in sentences]
+        return changed
+
+    def clips(self):
+        """Yields the sentences' clips in order, read from the TTS cache one at a time."""
+        cache = get_tts_cache()
+        for sentence, key in zip(self.sentences, self.keys):
+            clip = cache.get(key, self.format)
+            if clip is None:
+                # Evicted since it was synthesized
+                clip = self.synthesize(sentence, self.lang, self.engine)
+            yield clip
+
+    def save(self):
+        """Writes the spliced audio to the TTS cache entry for the whole text and returns its path."""
+        cache = get_tts_cache()
+        key = audio_key(self.text, self.lang, self.engine)
+        for _ in cache.put_stream(key, encode_stream(self.clips(), self.format), self.format):
+            pass
+        return cache.path_for(key, self.format)
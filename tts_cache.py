@@ -0,0 +1,177 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from audio_stream import tee_to_file
+from profiling import span
+
+# Synthesized audio is stored as audio_output/tts_<hash>.mp3; other files in the directory are left alone
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "audio_output")
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+TTS_CACHE_MAX_AGE = int(os.environ.get("TTS_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+TTS_CACHE_MEMORY_ENTRIES = 32
+CACHE_FILE_PREFIX = "tts_"
+
+
+def normalize_text(text):
+    """Collapses whitespace so layout-only OCR differences map to the same audio."""
+    return " ".join(text.split())
+
+
+def audio_key(text, lang, engine, voice=""):
+    """Builds a content hash for the audio of text spoken with the given engine settings."""
+    digest = hashlib.sha256()
+    digest.update(f"{engine}|{voice}|{lang}|".encode())
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TTSCache:
+    """Size/age-bounded on-disk cache of synthesized audio with a small in-memory tier."""
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES,
+                 max_age=TTS_CACHE_MAX_AGE, memory_entries=TTS_CACHE_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, key, ext="mp3"):
+        return os.path.join(self.cache_dir, f"{CACHE_FILE_PREFIX}{key}.{ext}")
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key, ext="mp3"):
+        """Returns cached audio bytes for key, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        path = self.path_for(key, ext)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Refresh the timestamp so eviction treats this entry as recently used
+            os.utime(path)
+        except OSError:
+            data = None
+
+        with self._lock:
+            if data:
+                self._remember(key, data)
+                self.hits += 1
+                return data
+            self.misses += 1
+        return None
+
+    def put(self, key, data, ext="mp3"):
+        """Stores audio bytes atomically (temp file then rename) and returns the cached path."""
+        if not data:
+            raise Exception("Generated audio is empty")
+
+        path = self.path_for(key, ext)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._remember(key, data)
+        self.evict()
+        return path
+
+    def open(self, key, ext="mp3"):
+        """Opens cached audio for streaming without loading it into memory; None on a miss."""
+        path = self.path_for(key, ext)
+        try:
+            f = open(path, "rb")
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return f
+
+    def put_stream(self, key, stream, ext="mp3"):
+        """Passes encoded audio chunks through while storing them; kept only if the stream completes."""
+        yield from tee_to_file(stream, self.path_for(key, ext))
+        self.evict()
+
+    def get_or_synthesize(self, text, synthesize, lang="en", engine="gtts", voice="", ext="mp3"):
+        """Returns audio bytes for text, calling synthesize() only when nothing is cached."""
+        key = audio_key(text, lang, engine, voice)
+        with span("tts.cache"):
+            data = self.get(key, ext)
+        if data is None:
+            with span("tts.synthesize"):
+                data = synthesize()
+            with span("tts.write"):
+                self.put(key, data, ext)
+        return data
+
+    def evict(self):
+        """Removes entries older than max_age, then the least recently used until under max_bytes."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.startswith(CACHE_FILE_PREFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """Returns the process-wide synthesized-audio cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TTSCache()
+        return _default_cache
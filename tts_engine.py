@@ -0,0 +1,178 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+# Default speech engine: "gtts" (network), "pyttsx3", "espeak" or "piper" (all offline)
+TTS_ENGINE = os.environ.get("TTS_ENGINE", "gtts")
+# Voice model for piper, e.g. /opt/piper/en_US-lessac-medium.onnx
+PIPER_MODEL = os.environ.get("PIPER_MODEL", "")
+
+
+class TTSEngine:
+    """Interface for speech backends: synthesize() returns encoded audio bytes in memory."""
+
+    name = "base"
+    label = "Base"
+    format = "wav"
+    offline = True
+
+    @property
+    def mime(self):
+        return f"audio/{self.format}"
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def synthesize(self, text, lang="en", voice=""):
+        raise NotImplementedError
+
+
+class GTTSEngine(TTSEngine):
+    """Google Text-to-Speech over HTTPS (needs network access).
+
+    Requests go through the shared GTTSClient: kept-alive connections, the
+    text's parts fetched in parallel, retries and a per-host rate limit.
+    """
+
+    name = "gtts"
+    label = "Google TTS (online)"
+    format = "mp3"
+    offline = False
+
+    @classmethod
+    def available(cls):
+        try:
+            import gtts  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def synthesize(self, text, lang="en", voice=""):
+        from gtts_client import get_gtts_client
+        return get_gtts_client().synthesize(text, lang=lang)
+
+
+class Pyttsx3Engine(TTSEngine):
+    """The system speech engine through pyttsx3, rendered to a file instead of the speakers."""
+
+    name = "pyttsx3"
+    label = "System voice (pyttsx3)"
+    format = "wav"
+
+    def __init__(self):
+        import pyttsx3
+        self._engine = pyttsx3.init()
+        # pyttsx3 drivers are not thread-safe
+        self._lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        try:
+            import pyttsx3  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def synthesize(self, text, lang="en", voice=""):
+        fd, path = tempfile.mkstemp(suffix=f".{self.format}")
+        os.close(fd)
+        try:
+            with self._lock:
+                if voice:
+                    self._engine.setProperty("voice", voice)
+                self._engine.save_to_file(text, path)
+                self._engine.runAndWait()
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+
+class EspeakEngine(TTSEngine):
+    """espeak-ng (or espeak) rendering WAV locally; no network needed."""
+
+    name = "espeak"
+    label = "eSpeak NG (offline)"
+    format = "wav"
+
+    @staticmethod
+    def _binary():
+        return shutil.which("espeak-ng") or shutil.which("espeak")
+
+    @classmethod
+    def available(cls):
+        return cls._binary() is not None
+
+    def synthesize(self, text, lang="en", voice=""):
+        binary = self._binary()
+        if binary is None:
+            raise Exception("espeak-ng is not installed")
+        # Write to a file rather than --stdout so the WAV header carries the real length
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            subprocess.run([binary, "-w", path, "-v", voice or lang, "--stdin"],
+                           input=text.encode("utf-8"), capture_output=True, check=True)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+
+class PiperEngine(TTSEngine):
+    """Piper neural TTS with a local voice model (PIPER_MODEL); fully local."""
+
+    name = "piper"
+    label = "Piper (offline)"
+    format = "wav"
+
+    @classmethod
+    def available(cls):
+        return shutil.which("piper") is not None and bool(PIPER_MODEL) and os.path.exists(PIPER_MODEL)
+
+    def synthesize(self, text, lang="en", voice=""):
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            subprocess.run(["piper", "--model", voice or PIPER_MODEL, "--output_file", path],
+                           input=text.encode("utf-8"), capture_output=True, check=True)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+
+TTS_ENGINES = {
+    GTTSEngine.name: GTTSEngine,
+    Pyttsx3Engine.name: Pyttsx3Engine,
+    EspeakEngine.name: EspeakEngine,
+    PiperEngine.name: PiperEngine,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def register_tts_engine(engine_class):
+    """Registers an additional TTSEngine subclass under its name."""
+    TTS_ENGINES[engine_class.name] = engine_class
+    return engine_class
+
+
+def available_tts_engines():
+    """Names of the registered engines that can run on this machine."""
+    return [name for name, engine_class in TTS_ENGINES.items() if engine_class.available()]
+
+
+def get_tts_engine(name=TTS_ENGINE):
+    """Returns the shared instance of the named engine."""
+    if name not in TTS_ENGINES:
+        raise ValueError(f"Unknown TTS engine: {name}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = TTS_ENGINES[name]()
+        return _instances[name]
+
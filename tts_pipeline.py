@@ -0,0 +1,68 @@
+import contextvars
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# How many sentences are synthesized ahead of the playback cursor
+TTS_LOOKAHEAD = 3
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n{2,}')
+
+
+def split_sentences(text):
+    """Splits text into sentences on ., ! or ? followed by whitespace, and on blank lines."""
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+class SentencePipeline:
+    """Synthesizes sentences concurrently, a bounded number ahead of the reader.
+
+    get(i) blocks until sentence i is ready and schedules the next `lookahead`
+    sentences, so playback can start after one sentence and repeat/skip can jump
+    to any index. Iterating yields (index, sentence, audio) in order.
+    """
+
+    def __init__(self, sentences, synthesize, lookahead=TTS_LOOKAHEAD):
+        self.sentences = list(sentences)
+        self.synthesize = synthesize
+        self.lookahead = max(1, lookahead)
+        self._executor = ThreadPoolExecutor(max_workers=self.lookahead, thread_name_prefix="tts")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _schedule(self, index):
+        if 0 <= index < len(self.sentences) and index not in self._futures:
+            # Run in a copy of the caller's context so profiling spans reach the caller's request
+            self._futures[index] = self._executor.submit(contextvars.copy_context().run,
+                                                         self.synthesize, self.sentences[index])
+
+    def get(self, index):
+        """Returns the audio for sentence `index`, prefetching the sentences after it."""
+        with self._lock:
+            for i in range(index, index + self.lookahead + 1):
+                self._schedule(i)
+            future = self._futures[index]
+            # Drop finished clips well behind the cursor so memory stays bounded
+            for old in [i for i in self._futures if i < index - self.lookahead]:
+                del self._futures[old]
+        return future.result()
+
+    def __iter__(self):
+        for index, sentence in enumerate(self.sentences):
+            yield index, sentence, self.get(index)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def close(self):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
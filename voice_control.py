@@ -0,0 +1,295 @@
+"""Hands-free reading: a background command listener and interruptible speech playback.
+
+The microphone (or a recorded WAV standing in for it) is read continuously on a
+background thread as short PCM frames. An energy detector, calibrated once on
+the ambient noise, cuts the stream into utterances; each utterance is passed to
+a recognizer (see command_recognizer.py) and any command found is put on a
+queue. Playback (audio_assembly.Speaker) runs in small blocks so a command can
+interrupt the sentence being spoken (barge-in).
+"""
+import os
+import queue
+import threading
+import time
+import wave
+
+import numpy as np
+
+COMMANDS = ("pause", "resume", "repeat", "skip", "stop", "play")
+# Spoken synonyms mapped onto the four playback actions
+COMMAND_ALIASES = {"play": "resume", "stop": "pause"}
+# Commands that cut off the sentence currently being spoken
+INTERRUPTING_COMMANDS = ("pause", "repeat", "skip")
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+# Ambient noise is measured once, over the first second of audio
+CALIBRATION_MS = 1000
+# Speech must be this many times louder than the ambient level (and above MIN_ENERGY)
+ENERGY_FACTOR = 3.0
+MIN_ENERGY = 300
+# Silence that ends an utterance, and the longest utterance kept
+HANGOVER_MS = 300
+MAX_UTTERANCE_MS = 3000
+# How long playback waits for the command behind an interruption to reach the queue
+COMMAND_GRACE_S = 0.1
+
+
+def parse_command(text):
+    """Returns the first command word in recognized text (aliases applied), or None."""
+    for word in (text or "").lower().split():
+        word = word.strip(".,!?")
+        if word in COMMANDS:
+            return COMMAND_ALIASES.get(word, word)
+    return None
+
+
+def frame_energy(frame):
+    """RMS level of a 16-bit mono PCM frame."""
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+class MicrophoneSource:
+    """Live 16-bit mono frames from the default input device, opened once."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+        import pyaudio
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(format=pyaudio.paInt16, channels=1, rate=sample_rate,
+                                        input=True, frames_per_buffer=self.frame_samples)
+
+    def __iter__(self):
+        while self._stream is not None:
+            yield self._stream.read(self.frame_samples, exception_on_overflow=False)
+
+    def close(self):
+        if self._stream is not None:
+            stream, self._stream = self._stream, None
+            stream.stop_stream()
+            stream.close()
+            self._audio.terminate()
+
+
+class WavSource:
+    """Frames from a recorded 16-bit WAV file, used in place of the microphone.
+
+    With realtime=True frames are paced like a live microphone; otherwise the
+    recording is read as fast as it is consumed.
+    """
+
+    def __init__(self, path, frame_ms=FRAME_MS, realtime=False):
+        self.path = path
+        self.frame_ms = frame_ms
+        self.realtime = realtime
+        with wave.open(path, "rb") as reader:
+            if reader.getsampwidth() != 2:
+                raise Exception(f"{path}: expected 16-bit PCM audio")
+            self.sample_rate = reader.getframerate()
+            self.channels = reader.getnchannels()
+        self.frame_samples = self.sample_rate * frame_ms // 1000
+        self._closed = False
+
+    def __iter__(self):
+        with wave.open(self.path, "rb") as reader:
+            while not self._closed:
+                data = reader.readframes(self.frame_samples)
+                if not data:
+                    break
+                if self.channels > 1:
+                    # Keep the first channel only
+                    data = np.frombuffer(data, dtype=np.int16)[::self.channels].tobytes()
+                if self.realtime:
+                    time.sleep(self.frame_ms / 1000)
+                yield data
+
+    def close(self):
+        self._closed = True
+
+
+class UtteranceDetector:
+    """Cuts a frame stream into utterances using an energy threshold calibrated once."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, hangover_ms=HANGOVER_MS):
+        self.frame_ms = frame_ms
+        self.sample_rate = sample_rate
+        self.hangover_ms = hangover_ms
+        self.threshold = None
+        self._calibration = []
+        self._frames = []
+        self._silent_ms = 0
+
+    def feed(self, frame):
+        """Adds one frame; returns the PCM bytes of an utterance once it has ended, else None."""
+        energy = frame_energy(frame)
+        if self.threshold is None:
+            self._calibration.append(energy)
+            if len(self._calibration) * self.frame_ms >= CALIBRATION_MS:
+                self.threshold = max(MIN_ENERGY, ENERGY_FACTOR * float(np.mean(self._calibration)))
+            return None
+
+        if energy >= self.threshold:
+            self._frames.append(frame)
+            self._silent_ms = 0
+        elif self._frames:
+            self._frames.append(frame)
+            self._silent_ms += self.frame_ms
+            if self._silent_ms >= self.hangover_ms:
+                return self.flush()
+
+        if len(self._frames) * self.frame_ms >= MAX_UTTERANCE_MS:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Returns any utterance in progress (e.g. when the stream ends) and resets."""
+        utterance = b"".join(self._frames)
+        self._frames = []
+        self._silent_ms = 0
+        return utterance or None
+
+
+class CommandListener:
+    """Listens on a background thread and puts recognized commands on `commands`.
+
+    `recognizer` is a command_recognizer.CommandRecognizer; `on_command` is
+    called right before a command is queued, so playback has already been
+    interrupted when the command is read.
+    `latencies` records the seconds spent recognizing each command.
+    """
+
+    def __init__(self, source, recognizer, on_command=None):
+        self.source = source
+        self.recognizer = recognizer
+        self.on_command = on_command
+        self.commands = queue.Queue()
+        self.latencies = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="voice-commands", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        if self.recognizer.streaming:
+            # The recognizer does its own endpointing and can answer mid-word
+            for frame in self.source:
+                if self._stop.is_set():
+                    break
+                self._handle(self.recognizer.accept, frame)
+            return
+
+        detector = UtteranceDetector(self.source.sample_rate, self.source.frame_ms, self.recognizer.hangover_ms)
+        for frame in self.source:
+            if self._stop.is_set():
+                break
+            utterance = detector.feed(frame)
+            if utterance:
+                self._handle(self.recognizer.recognize, utterance)
+        else:
+            # End of a recording: an utterance may still be open
+            utterance = detector.flush()
+            if utterance and not self._stop.is_set():
+                self._handle(self.recognizer.recognize, utterance)
+
+    def _handle(self, recognize, audio):
+        t0 = time.perf_counter()
+        try:
+            text = recognize(audio, self.source.sample_rate)
+        except Exception as e:
+            print(f"❌ Error in voice recognition: {e}")
+            return
+        command = parse_command(text)
+        if command:
+            self.latencies.append(time.perf_counter() - t0)
+            print(f"✅ You said: {command}")
+            if self.on_command:
+                self.on_command(command)
+            self.commands.put(command)
+
+    def join(self, timeout=None):
+        """Waits for the source to run out (used with recorded fixtures)."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stop(self):
+        self._stop.set()
+        self.source.close()
+        self.join(timeout=2)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def take_command(commands, speaker, timeout=0):
+    """Next queued command, waiting up to `timeout` seconds (None: until one arrives), or None.
+
+    Taking a command re-arms the speaker: the interruption it caused is cleared
+    only now, so a command heard between two sentences still stops the next one.
+    """
+    try:
+        command = commands.get(block=timeout != 0, timeout=timeout)
+    except queue.Empty:
+        return None
+    speaker.clear_interrupt()
+    return command
+
+
+def read_aloud(sentences, clip_for, speaker, commands):
+    """Speaks sentences in order, reacting to commands from the queue as they arrive.
+
+    `clip_for(index)` returns the PCMClip of a sentence. While paused the loop
+    blocks on the queue instead of polling; pause/repeat/skip interrupt the
+    current sentence immediately. A command that arrives after a sentence has
+    ended applies to the next one ("repeat" replays the sentence just heard).
+    """
+    index = 0
+    paused = False
+    while index < len(sentences):
+        if paused:
+            command = take_command(commands, speaker, timeout=None)
+        else:
+            command = take_command(commands, speaker)
+            if command is None:
+                print(f"📖 Reading: {sentences[index]}")
+                finished = speaker.play(clip_for(index))
+                # The listener interrupts before it queues, so a cut-off sentence has its command on the way
+                command = take_command(commands, speaker, timeout=0 if finished else COMMAND_GRACE_S)
+                if command is None:
+                    if not finished:
+                        # Interrupted without a command (speaker.interrupt()): move on rather than replay
+                        speaker.clear_interrupt()
+                    index += 1
+                    continue
+                if finished and command != "repeat":
+                    index += 1
+
+        if command == "pause":
+            print("⏸ Paused.")
+            paused = True
+        elif command == "resume":
+            print("▶ Resuming...")
+            paused = False
+        elif command == "repeat":
+            print("🔄 Repeating sentence...")
+            paused = False
+        elif command == "skip":
+            print("⏭ Skipping to next sentence...")
+            index += 1
+            paused = False
+
+
+def command_source():
+    """The microphone, or the recording named by VOICE_COMMAND_WAV when set."""
+    path = os.environ.get("VOICE_COMMAND_WAV", "")
+    if path:
+        return WavSource(path, realtime=True)
+    return MicrophoneSource()